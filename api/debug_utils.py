@@ -1,27 +1,32 @@
-import asyncio
-from typing import Optional
+import os
 
 debug_manager = None
 
+# Echo debug messages to stdout (the WebSocket debug panel receives them regardless while connected)
+DEBUG_ENABLED = os.getenv("LLM_DEBUG", "0").lower() in ("1", "true", "yes")
+
+# Numeric levels for debug_print; messages below DEBUG_LEVEL are dropped before any work
+_LEVELS = {"debug": 10, "info": 20, "warn": 30, "warning": 30, "error": 40}
+_MIN_LEVEL = _LEVELS.get(os.getenv("DEBUG_LEVEL", "info").lower(), 20)
+
+
 def set_debug_manager(manager):
+    """Register the WebSocket manager that debug_print forwards messages to"""
     global debug_manager
     debug_manager = manager
 
+def debug_active() -> bool:
+    """Whether debug_print output goes anywhere; lets callers skip building expensive messages"""
+    return DEBUG_ENABLED or bool(debug_manager and debug_manager.active_connections)
+
 def debug_print(message: str, level: str = "info"):
     """Print message and broadcast to WebSocket debug panel"""
-    print(message)
-    
-    # Broadcast to WebSocket if manager is available
-    if debug_manager and debug_manager.active_connections:
-        try:
-            # Try to get current event loop
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Schedule the broadcast as a task
-                asyncio.create_task(debug_manager.broadcast_debug(message, level))
-            else:
-                # If no running loop, just print
-                pass
-        except Exception as e:
-            # If there's any error with WebSocket broadcasting, just continue
-            pass 
\ No newline at end of file
+    if _LEVELS.get(level, 20) < _MIN_LEVEL:
+        return
+
+    if DEBUG_ENABLED:
+        print(message)
+
+    # The manager queues the message for its background flusher; this never blocks
+    if debug_manager is not None:
+        debug_manager.broadcast_debug(message, level)
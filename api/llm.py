@@ -1,13 +1,21 @@
-from openai import AsyncOpenAI
-from typing import List, Dict, Any, Generator, Optional, Callable, Union, AsyncGenerator
+from openai import AsyncOpenAI, APIError
+from typing import List, Dict, Any, Generator, Optional, Callable, Union, AsyncGenerator, Tuple
 import logging
 import json
 import aiohttp
 import asyncio
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import os
 from dotenv import load_dotenv
-from debug_utils import debug_print
+from debug_utils import debug_print, debug_active
+
+try:
+    import orjson
+    _json_loads = orjson.loads  # accepts bytes directly, no decode needed
+except ImportError:
+    _json_loads = json.loads
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,6 +26,271 @@ logger = logging.getLogger(__name__)
 # Or keep a default like this if OPENROUTER_API_MODEL is not set
 default_model = os.getenv('OPENROUTER_API_MODEL', 'google/gemini-2.5-pro')
 
+# Provider credentials/config, read once at import (after load_dotenv) instead of per call
+_OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+_OPENROUTER_SITE_URL = os.getenv('OPENROUTER_SITE_URL')
+_OPENROUTER_SITE_TITLE = os.getenv('OPENROUTER_SITE_TITLE')
+_SAMBANOVA_MODEL = os.getenv('SAMBANOVA_MODEL', "Llama-4-Scout-17B-16E-Instruct")  # Default from quickstart if not in settings
+_SAMBANOVA_API_KEY = os.getenv('SAMBANOVA_API_KEY')
+_ANAKIN_API_KEY = os.getenv('ANAKIN_API_KEY')
+_ANAKIN_APP_ID = os.getenv('ANAKIN_APP_ID')
+_ANAKIN_API_VERSION = os.getenv('ANAKIN_API_VERSION', '2024-05-06')
+
+# SSE framing used by the Anakin stream
+_SSE_DATA_PREFIX = b"data: "
+_SSE_DONE = b"[DONE]"
+
+
+# Lightweight stand-ins for the OpenAI SDK's streaming chunk objects (used by the Anakin adapter)
+@dataclass(slots=True)
+class _Delta:
+    content: str
+    role: Optional[str]
+    reasoning: Optional[str] = None
+
+
+@dataclass(slots=True)
+class _Choice:
+    index: int
+    delta: _Delta
+    finish_reason: Optional[str]
+
+
+@dataclass(slots=True)
+class _Chunk:
+    id: str
+    object: str
+    created: int
+    model: str
+    choices: List[_Choice]
+
+
+def _merge_chunks(chunks: List[Any]) -> Any:
+    """Merge consecutive streaming chunks into one OpenAI-compatible chunk."""
+    if len(chunks) == 1:
+        return chunks[0]
+
+    content_parts: List[str] = []
+    reasoning_parts: List[str] = []
+    finish_reason = None
+    for chunk in chunks:
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        content = getattr(choice.delta, 'content', None)
+        if content:
+            content_parts.append(content)
+        reasoning = getattr(choice.delta, 'reasoning', None)
+        if reasoning:
+            reasoning_parts.append(reasoning)
+        if choice.finish_reason:
+            finish_reason = choice.finish_reason
+
+    last = chunks[-1]
+    content = "".join(content_parts)
+    return _Chunk(
+        id=last.id,
+        object='chat.completion.chunk',
+        created=last.created,
+        model=last.model,
+        choices=[_Choice(0, _Delta(content, 'assistant' if content else None, "".join(reasoning_parts) or None), finish_reason)]
+    )
+
+
+async def _coalesce_chunks(stream: AsyncGenerator[Any, None], coalesce_ms: int) -> AsyncGenerator[Any, None]:
+    """
+    Re-yield a chunk stream, merging chunks that arrive within coalesce_ms of the previous flush.
+    A chunk carrying a finish_reason always flushes immediately.
+    """
+    loop = asyncio.get_running_loop()
+    interval = coalesce_ms / 1000
+    buffer: List[Any] = []
+    last_flush = loop.time()
+    async for chunk in stream:
+        buffer.append(chunk)
+        finished = bool(chunk.choices) and chunk.choices[0].finish_reason is not None
+        if finished or loop.time() - last_flush >= interval:
+            yield _merge_chunks(buffer)
+            buffer = []
+            last_flush = loop.time()
+    if buffer:
+        yield _merge_chunks(buffer)
+
+# Process-wide executor for blocking work (the OpenAI SDK calls asyncio.to_thread).
+# Sized once from the environment instead of building a 4-thread pool per stream.
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv('THREAD_POOL_SIZE') or min(32, (os.cpu_count() or 1) + 4)),
+    thread_name_prefix="llm-io",
+)
+
+
+def install_default_executor() -> None:
+    """Install the shared executor as the running loop's default executor. Call once on application startup."""
+    asyncio.get_running_loop().set_default_executor(_EXECUTOR)
+    logger.debug("Installed shared ThreadPoolExecutor as default executor")
+
+
+# Long-lived HTTP clients, reused across streams so each request takes a warm
+# connection from the pool instead of paying a fresh TLS handshake.
+_CLIENTS: Dict[Tuple[str, str], AsyncOpenAI] = {}
+_anakin_session: Optional[aiohttp.ClientSession] = None
+
+
+def _get_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """Return the cached AsyncOpenAI client for (base_url, api_key), creating it on first use."""
+    client = _CLIENTS.get((base_url, api_key))
+    if client is None:
+        logger.debug(f"Initializing AsyncOpenAI client for {base_url}")
+        client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+        _CLIENTS[(base_url, api_key)] = client
+    return client
+
+
+def _get_anakin_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session used for Anakin streams, creating it lazily."""
+    global _anakin_session
+    if _anakin_session is None or _anakin_session.closed:
+        _anakin_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True,
+            ),
+            # No overall deadline for long streams, but give up on a silent connection
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=60),
+        )
+    return _anakin_session
+
+
+async def close_clients() -> None:
+    """Close all cached LLM HTTP clients. Call once on application shutdown."""
+    global _anakin_session
+    for client in _CLIENTS.values():
+        await client.close()
+    _CLIENTS.clear()
+    if _anakin_session is not None and not _anakin_session.closed:
+        await _anakin_session.close()
+    _anakin_session = None
+
+
+# Request parameters left out of debug logs (large and/or sensitive)
+_LOG_EXCLUDED_PARAMS = frozenset({"messages", "response_format"})
+
+# Chunks a slow callback may fall behind the stream before reading pauses (back-pressure)
+_CALLBACK_QUEUE_SIZE = 64
+
+
+async def _dispatch_to_callback(stream: AsyncGenerator[Any, None], callback: Callable) -> AsyncGenerator[Any, None]:
+    """
+    Re-yield a chunk stream while a separate task feeds each chunk, in order, to an async callback.
+
+    The callback runs off the stream-reading coroutine through a bounded queue, so a slow callback
+    only stalls reading once it is _CALLBACK_QUEUE_SIZE chunks behind. Callback errors are re-raised here.
+    If the caller stops iterating early, chunks still queued for the callback are dropped.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_CALLBACK_QUEUE_SIZE)
+
+    async def consume():
+        while True:
+            chunk = await queue.get()
+            await callback(chunk)
+            queue.task_done()
+
+    consumer = asyncio.create_task(consume())
+    try:
+        async for chunk in stream:
+            if consumer.done():
+                consumer.result()  # Surface the callback's exception
+            if queue.full():
+                # Wait for room, but not on a consumer that has died and will never make any
+                put = asyncio.ensure_future(queue.put(chunk))
+                try:
+                    await asyncio.wait({put, consumer}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    queued = put.done()
+                    put.cancel()
+                if not queued:
+                    consumer.result()
+            else:
+                queue.put_nowait(chunk)
+            yield chunk
+
+        # Wait for the callback to catch up (or fail) before finishing the stream
+        drained = asyncio.ensure_future(queue.join())
+        await asyncio.wait({drained, consumer}, return_when=asyncio.FIRST_COMPLETED)
+        drained.cancel()
+        if consumer.done():
+            consumer.result()
+    finally:
+        consumer.cancel()
+
+
+class StreamConfig:
+    """
+    Reusable OpenRouter request options for stream_text.
+
+    Builds the model parameters, structured output format, extra_body and extra_headers once,
+    so callers issuing many requests with the same configuration don't rebuild them per call.
+    The built dicts are shared between calls and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        model: str = default_model,
+        max_tokens: int = 4096,
+        response_schema: Optional[Dict[str, Any]] = None,
+        schema_name: Optional[str] = None,
+        schema_strict: bool = True,
+        include_reasoning: bool = False,
+        site_url: Optional[str] = None,
+        site_title: Optional[str] = None,
+    ):
+        if site_url is None:
+            site_url = _OPENROUTER_SITE_URL
+        if site_title is None:
+            site_title = _OPENROUTER_SITE_TITLE
+
+        self.model = model
+        self.params: Dict[str, Any] = {
+            "model": model,
+            "max_tokens": max_tokens,
+        }
+
+        # Add structured output configuration if schema is provided
+        # Note: The standard 'response_format' might need to go in extra_body too if not supported directly by SDK version
+        # Let's try keeping it direct first, as it's more standard OpenAI API now.
+        if response_schema:
+            schema_name_to_use = schema_name or "custom_schema"
+            if not schema_name:
+                 logger.warning("No schema_name provided for structured output, using default: 'custom_schema'")
+            self.params["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema_name_to_use,
+                    "strict": schema_strict,
+                    "schema": response_schema
+                }
+            }
+            logger.info(f"Using structured output with schema name: {schema_name_to_use}, strict: {schema_strict}")
+
+        # --- Prepare extra_body for non-standard params ---
+        self.extra_body: Optional[Dict[str, Any]] = None
+        if include_reasoning:
+            # Pass reasoning={} in extra_body
+            self.extra_body = {"reasoning": {}}
+            logger.info("Requesting reasoning tokens via extra_body={'reasoning': {}}.")
+
+        # Add optional headers for OpenRouter ranking
+        extra_headers = {}
+        if site_url:
+            extra_headers["HTTP-Referer"] = site_url
+        if site_title:
+            extra_headers["X-Title"] = site_title
+        if extra_headers:
+             self.params["extra_headers"] = extra_headers
+
+
 async def stream_text(
     prompt: str,
     model: str = default_model,
@@ -25,13 +298,15 @@ async def stream_text(
     system_prompt: Optional[str] = None,
     messages: Optional[List[Dict[str, Any]]] = None,
     callback: Optional[Callable] = None,
-    site_url: Optional[str] = os.getenv('OPENROUTER_SITE_URL'), # Optional: For leaderboard ranking
-    site_title: Optional[str] = os.getenv('OPENROUTER_SITE_TITLE'), # Optional: For leaderboard ranking
+    site_url: Optional[str] = None, # Optional: For leaderboard ranking (defaults to OPENROUTER_SITE_URL)
+    site_title: Optional[str] = None, # Optional: For leaderboard ranking (defaults to OPENROUTER_SITE_TITLE)
     response_schema: Optional[Dict[str, Any]] = None, # New: JSON schema for structured output
     schema_name: Optional[str] = None, # New: Optional name for the schema (used in OpenRouter's format)
     schema_strict: bool = True, # New: Enforce strict schema adherence (recommended by OpenRouter)
     include_reasoning: bool = False, # New: Request reasoning tokens
     should_use_anakin: bool = False, # New: Whether to use Anakin API instead of OpenRouter
+    config: Optional[StreamConfig] = None, # Prebuilt request options; overrides model/max_tokens/schema/reasoning/site args
+    coalesce_ms: int = 0, # Merge deltas arriving within this window into one chunk (0 = yield every chunk)
 ) -> AsyncGenerator[Dict[str, Any], None]:
     """
     Stream text responses from OpenRouter API asynchronously using the OpenAI SDK compatibility.
@@ -50,165 +325,120 @@ async def stream_text(
         schema_name: Optional name for the schema (required by OpenRouter's structure if response_schema is used).
         schema_strict: If using response_schema, whether to enforce strict adherence. Defaults to True.
         include_reasoning: Whether to request reasoning tokens (supported by specific models).
+        should_use_anakin: Whether to route the request to the Anakin API instead of OpenRouter.
+        config: Optional prebuilt StreamConfig. When given, its options replace model, max_tokens,
+            site_url, site_title, response_schema, schema_name, schema_strict and include_reasoning.
+        coalesce_ms: If > 0, consecutive chunks arriving within this many milliseconds are merged
+            into a single chunk before the callback/yield. Useful for chatty token-level streams.
 
     Yields:
         Dictionary containing event information for each streaming event (OpenAI format, potentially with a 'reasoning' field).
     """
+    if config is not None:
+        model = config.model
+
     logger.info(f"Starting async stream_text with OpenRouter model: {model}")
     logger.debug(f"Prompt length: {len(prompt)} characters")
-    debug_print(f"🚀 [LLM] Starting stream with model: {model}")
-    debug_print(f"📝 [LLM] Prompt: {prompt[:200]}..." if len(prompt) > 200 else f"📝 [LLM] Prompt: {prompt}")
-    debug_print(f"🔧 [LLM] System prompt: {system_prompt[:100]}..." if system_prompt and len(system_prompt) > 100 else f"🔧 [LLM] System prompt: {system_prompt}")
-
-    # --- Ensure event loop has a default ThreadPoolExecutor (OpenAI SDK calls asyncio.to_thread) ---
-    try:
-        loop = asyncio.get_running_loop()
-        if getattr(loop, "_default_executor", None) is None:
-            import concurrent.futures
-            loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=4))
-            logger.debug("Set new default ThreadPoolExecutor for event loop")
-    except RuntimeError:
-        # No running loop (shouldn't happen in async context), ignore
-        pass
-
-    # Also check if the executor has been shut down and needs replacement
-    try:
-        loop = asyncio.get_running_loop()
-        executor = getattr(loop, "_default_executor", None)
-        if executor and hasattr(executor, "_shutdown") and executor._shutdown:
-            import concurrent.futures
-            new_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
-            loop.set_default_executor(new_executor)
-            logger.debug("Replaced shut down ThreadPoolExecutor with new one")
-    except Exception as e:
-        logger.debug(f"Could not check/replace executor: {e}")
+    if debug_active():
+        debug_print(f"🚀 [LLM] Starting stream with model: {model}")
+        debug_print(f"📝 [LLM] Prompt: {prompt[:200]}..." if len(prompt) > 200 else f"📝 [LLM] Prompt: {prompt}")
+        debug_print(f"🔧 [LLM] System prompt: {system_prompt[:100]}..." if system_prompt and len(system_prompt) > 100 else f"🔧 [LLM] System prompt: {system_prompt}")
 
     if should_use_anakin:
         print("Using Anakin API")
-        async for chunk in stream_text_anakin(prompt, model, max_tokens, system_prompt, messages, callback):
+        async for chunk in stream_text_anakin(prompt, model, max_tokens, system_prompt, messages, callback, coalesce_ms=coalesce_ms):
             yield chunk
         return
 
     try:
         # Check if API key is configured
-        openrouter_api_key = os.getenv('OPENROUTER_API_KEY')
+        openrouter_api_key = _OPENROUTER_API_KEY
         if not openrouter_api_key:
             logger.error("OPENROUTER_API_KEY is not configured in environment")
             raise ValueError("OPENROUTER_API_KEY is not configured")
 
-        logger.debug("Initializing AsyncOpenAI client for OpenRouter")
-        client = AsyncOpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=openrouter_api_key,
-        )
+        client = _get_client("https://openrouter.ai/api/v1", openrouter_api_key)
 
         # Configure messages
         if messages is None:
             logger.debug("Using single prompt message")
-            messages_config = [{"role": "user", "content": prompt}]
+            # A freshly built prompt message can't contain a system message, so no scan is needed
+            if system_prompt:
+                messages_config = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+            else:
+                messages_config = [{"role": "user", "content": prompt}]
         else:
             logger.debug(f"Using provided messages array with {len(messages)} messages")
             messages_config = messages
 
-        # Add system prompt if provided and messages_config doesn't already have one
-        if system_prompt and not any(msg['role'] == 'system' for msg in messages_config):
-             logger.debug("Prepending system prompt")
-             messages_config.insert(0, {"role": "system", "content": system_prompt})
-        elif system_prompt:
-             logger.warning("System prompt provided but messages_config already contains a system message. Ignoring provided system_prompt argument.")
-
-
-        # Prepare standard stream parameters
+            # Add system prompt if provided and messages_config doesn't already have one
+            if system_prompt and not any(msg['role'] == 'system' for msg in messages_config):
+                 logger.debug("Prepending system prompt")
+                 # Build a new list rather than inserting into the caller's list
+                 messages_config = [{"role": "system", "content": system_prompt}, *messages]
+            elif system_prompt:
+                 logger.warning("System prompt provided but messages_config already contains a system message. Ignoring provided system_prompt argument.")
+
+
+        # Request options are built once per configuration; only messages vary per call
+        if config is None:
+            config = StreamConfig(
+                model=model,
+                max_tokens=max_tokens,
+                response_schema=response_schema,
+                schema_name=schema_name,
+                schema_strict=schema_strict,
+                include_reasoning=include_reasoning,
+                site_url=site_url,
+                site_title=site_title,
+            )
         stream_params: Dict[str, Any] = {
-            "model": model,
-            "max_tokens": max_tokens,
+            **config.params,
             "messages": messages_config,
             "stream": True,
         }
-
-        # --- Prepare extra_body for non-standard params ---
-        extra_body: Dict[str, Any] = {}
-
-        # Add structured output configuration if schema is provided
-        # Note: The standard 'response_format' might need to go in extra_body too if not supported directly by SDK version
-        # Let's try keeping it direct first, as it's more standard OpenAI API now.
-        if response_schema:
-            schema_name_to_use = schema_name or "custom_schema"
-            if not schema_name:
-                 logger.warning("No schema_name provided for structured output, using default: 'custom_schema'")
-            structured_output_config = {
-                "type": "json_schema",
-                "json_schema": {
-                    "name": schema_name_to_use,
-                    "strict": schema_strict,
-                    "schema": response_schema
-                }
-            }
-            # Check if 'response_format' is a known param, if not, move to extra_body
-            # For now, assume it's standard and keep in stream_params
-            stream_params["response_format"] = structured_output_config
-            logger.info(f"Using structured output with schema name: {schema_name_to_use}, strict: {schema_strict}")
-
-
-        # --- Add reasoning parameter to extra_body ---
-        if include_reasoning:
-            # Pass reasoning={} in extra_body
-            extra_body["reasoning"] = {}
-            logger.info("Requesting reasoning tokens via extra_body={'reasoning': {}}.")
-
-
-        # Add optional headers for OpenRouter ranking
-        extra_headers = {}
-        if site_url:
-            extra_headers["HTTP-Referer"] = site_url
-        if site_title:
-            extra_headers["X-Title"] = site_title
-        # Add extra_headers to stream_params if they exist
-        if extra_headers:
-             stream_params["extra_headers"] = extra_headers
+        extra_body = config.extra_body
 
 
         logger.info("Starting async stream with OpenRouter API")
-        # Log parameters, including extra_body if present
-        loggable_params = {k: v for k, v in stream_params.items() if k not in ['messages', 'response_format']}
-        if "response_format" in stream_params:
-            loggable_params["response_format_type"] = stream_params["response_format"].get("type")
-            loggable_params["schema_name"] = stream_params["response_format"].get("json_schema", {}).get("name")
-        if extra_body:
-             loggable_params["extra_body"] = extra_body # Log extra_body content
-        logger.debug(f"Stream parameters (excluding messages/schema): {loggable_params}")
+        # Log parameters, including extra_body if present (only built when debug logging is on)
+        if logger.isEnabledFor(logging.DEBUG):
+            loggable_params = {k: v for k, v in stream_params.items() if k not in _LOG_EXCLUDED_PARAMS}
+            if "response_format" in stream_params:
+                loggable_params["response_format_type"] = stream_params["response_format"].get("type")
+                loggable_params["schema_name"] = stream_params["response_format"].get("json_schema", {}).get("name")
+            if extra_body:
+                 loggable_params["extra_body"] = extra_body # Log extra_body content
+            logger.debug(f"Stream parameters (excluding messages/schema): {loggable_params}")
 
         try:
             # Pass extra_body to the create call
-            stream = await client.chat.completions.create(**stream_params, extra_body=extra_body if extra_body else None)
+            stream = await client.chat.completions.create(**stream_params, extra_body=extra_body)
             logger.info("Stream connection established")
             debug_print("✅ [LLM] Stream connection established with OpenRouter")
+            # Per-chunk logging is only built when debug logging is on, to keep the hot path cheap
+            log_debug = logger.isEnabledFor(logging.DEBUG) and debug_active()
+            if coalesce_ms > 0:
+                stream = _coalesce_chunks(stream, coalesce_ms)
+            if callback:
+                # Callback needs to handle chunk structure
+                stream = _dispatch_to_callback(stream, callback)
             chunk_count = 0
             async for chunk in stream:
                 chunk_count += 1
-                # Log the event type (chunk usually has choices)
-                logger.debug(f"Received chunk: {chunk.id}")
-                
-                # Print chunk details
-                if chunk.choices and chunk.choices[0].delta:
-                    delta = chunk.choices[0].delta
-                    if hasattr(delta, 'content') and delta.content:
-                        debug_print(f"📦 [LLM] Chunk #{chunk_count}: {repr(delta.content[:50])}")
-                    if hasattr(delta, 'reasoning') and delta.reasoning:
-                        debug_print(f"🧠 [LLM] Reasoning chunk #{chunk_count}: {repr(delta.reasoning[:50])}")
-
-                # --- ADDED: Check for reasoning in the chunk based on docs example ---
-                reasoning_content = None
-                if chunk.choices and hasattr(chunk.choices[0].delta, 'reasoning'):
-                    reasoning_content = chunk.choices[0].delta.reasoning
-                    if reasoning_content:
-                         logger.debug(f"Chunk contains reasoning delta: {reasoning_content}")
-                # --- END ADDED ---
-
-                # Process the event with callback
-                if callback:
-                    logger.debug("Calling user-provided callback")
-                    await callback(chunk) # Callback needs to handle chunk structure
+
+                if log_debug:
+                    # Log the event type (chunk usually has choices) and print chunk details
+                    logger.debug(f"Received chunk: {chunk.id}")
+                    delta = chunk.choices[0].delta if chunk.choices else None
+                    if delta is not None:
+                        content = getattr(delta, 'content', None)
+                        if content:
+                            debug_print(f"📦 [LLM] Chunk #{chunk_count}: {repr(content[:50])}")
+                        reasoning = getattr(delta, 'reasoning', None)
+                        if reasoning:
+                            debug_print(f"🧠 [LLM] Reasoning chunk #{chunk_count}: {repr(reasoning[:50])}")
+                            logger.debug(f"Chunk contains reasoning delta: {reasoning}")
 
                 # Yield the chunk (OpenAI object) to the caller
                 yield chunk
@@ -217,18 +447,19 @@ async def stream_text(
 
             logger.info("Stream completed successfully")
 
-        except Exception as stream_error:
-            # General error handling
+        except APIError as stream_error:
+            # API/connection error handling (the SDK wraps httpx errors in APIError subclasses)
             logger.error(f"Error during async streaming with OpenRouter: {str(stream_error)}", exc_info=True)
             # Check if the error message indicates lack of support for reasoning *parameter* specifically
-            if extra_body.get("reasoning") is not None and ("reasoning" in str(stream_error).lower() or "support" in str(stream_error).lower()):
+            if extra_body and extra_body.get("reasoning") is not None and ("reasoning" in str(stream_error).lower() or "support" in str(stream_error).lower()):
                  logger.warning(f"Model '{model}' might not support the 'reasoning' parameter via extra_body, or the parameter structure is incorrect.")
             # Check for structured output errors
             if "response_format" in stream_params and "support" in str(stream_error).lower():
                  logger.warning(f"Model '{model}' might not support structured outputs ('response_format'), or the schema might be invalid.")
             raise
 
-    except Exception as e:
+    except ValueError as e:
+        # Configuration errors; API errors are logged above and anything else propagates untouched
         logger.error(f"Error in async stream_text (OpenRouter): {str(e)}", exc_info=True)
         # Re-raise the exception after logging
         raise
@@ -236,7 +467,7 @@ async def stream_text(
 
 async def stream_sambanova(
     prompt: str,
-    model: str = os.getenv('SAMBANOVA_MODEL', "Llama-4-Scout-17B-16E-Instruct"), # Default from quickstart if not in settings
+    model: Optional[str] = None, # Defaults to SAMBANOVA_MODEL
     max_tokens: int = 2048, # SambaNova might have different defaults/limits
     system_prompt: Optional[str] = None,
     messages: Optional[List[Dict[str, Any]]] = None,
@@ -247,7 +478,7 @@ async def stream_sambanova(
 
     Args:
         prompt: The user prompt to send to the model.
-        model: The model identifier for SambaNova (e.g., 'Meta-Llama-3.1-405B-Instruct').
+        model: The model identifier for SambaNova (e.g., 'Meta-Llama-3.1-405B-Instruct'). Defaults to SAMBANOVA_MODEL.
         max_tokens: Maximum number of tokens in the response.
         system_prompt: Optional system prompt.
         messages: Optional list of message objects (overrides prompt if provided).
@@ -256,38 +487,42 @@ async def stream_sambanova(
     Yields:
         Dictionary containing event information for each streaming event (OpenAI format).
     """
+    if model is None:
+        model = _SAMBANOVA_MODEL
+
     logger.info(f"Starting async stream_sambanova with SambaNova model: {model}")
     logger.debug(f"Prompt length: {len(prompt)} characters")
 
     try:
         # Check if API key is configured
-        sambanova_api_key = os.getenv('SAMBANOVA_API_KEY')
+        sambanova_api_key = _SAMBANOVA_API_KEY
         if not sambanova_api_key:
             logger.error("SAMBANOVA_API_KEY is not configured in environment")
             raise ValueError("SAMBANOVA_API_KEY is not configured")
 
         sambanova_base_url = "https://api.sambanova.ai/v1" # As per SambaNova documentation
 
-        logger.debug(f"Initializing AsyncOpenAI client for SambaNova: {sambanova_base_url}")
-        client = AsyncOpenAI(
-            base_url=sambanova_base_url,
-            api_key=sambanova_api_key,
-        )
+        client = _get_client(sambanova_base_url, sambanova_api_key)
 
         # Configure messages
         if messages is None:
             logger.debug("Using single prompt message for SambaNova")
-            messages_config = [{"role": "user", "content": prompt}]
+            # A freshly built prompt message can't contain a system message, so no scan is needed
+            if system_prompt:
+                messages_config = [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+            else:
+                messages_config = [{"role": "user", "content": prompt}]
         else:
             logger.debug(f"Using provided messages array with {len(messages)} messages for SambaNova")
             messages_config = messages
 
-        # Add system prompt if provided and messages_config doesn't already have one
-        if system_prompt and not any(msg['role'] == 'system' for msg in messages_config):
-             logger.debug("Prepending system prompt for SambaNova")
-             messages_config.insert(0, {"role": "system", "content": system_prompt})
-        elif system_prompt:
-             logger.warning("System prompt provided for SambaNova but messages_config already contains a system message. Ignoring provided system_prompt argument.")
+            # Add system prompt if provided and messages_config doesn't already have one
+            if system_prompt and not any(msg['role'] == 'system' for msg in messages_config):
+                 logger.debug("Prepending system prompt for SambaNova")
+                 # Build a new list rather than inserting into the caller's list
+                 messages_config = [{"role": "system", "content": system_prompt}, *messages]
+            elif system_prompt:
+                 logger.warning("System prompt provided for SambaNova but messages_config already contains a system message. Ignoring provided system_prompt argument.")
 
         # Prepare standard stream parameters
         stream_params: Dict[str, Any] = {
@@ -301,27 +536,27 @@ async def stream_sambanova(
         # If a specific model requires it, it should be passed in `model_specific_params` or similar.
 
         logger.info("Starting async stream with SambaNova API")
-        loggable_params = {k: v for k, v in stream_params.items() if k != 'messages'}
-        logger.debug(f"SambaNova Stream parameters (excluding messages): {loggable_params}")
+        if logger.isEnabledFor(logging.DEBUG):
+            loggable_params = {k: v for k, v in stream_params.items() if k != 'messages'}
+            logger.debug(f"SambaNova Stream parameters (excluding messages): {loggable_params}")
 
         try:
             stream = await client.chat.completions.create(**stream_params)
             logger.info("SambaNova stream connection established")
+            if callback:
+                stream = _dispatch_to_callback(stream, callback)
+            log_debug = logger.isEnabledFor(logging.DEBUG)
             async for chunk in stream:
-                logger.debug(f"SambaNova received chunk: {chunk.id}")
-
-                if callback:
-                    logger.debug("Calling user-provided callback for SambaNova chunk")
-                    await callback(chunk)
-
+                if log_debug:
+                    logger.debug(f"SambaNova received chunk: {chunk.id}")
                 yield chunk
             logger.info("SambaNova stream completed successfully")
 
-        except Exception as stream_error:
+        except APIError as stream_error:
             logger.error(f"Error during async streaming with SambaNova: {str(stream_error)}", exc_info=True)
             raise
 
-    except Exception as e:
+    except ValueError as e:
         logger.error(f"Error in async stream_sambanova: {str(e)}", exc_info=True)
         raise
 
@@ -335,6 +570,7 @@ async def stream_text_anakin(
     callback: Optional[Callable] = None,
     thread_id: Optional[str] = None,  # Anakin-specific parameter
     app_id: Optional[str] = None,  # Anakin-specific parameter
+    coalesce_ms: int = 0,  # Merge deltas arriving within this window into one chunk (0 = yield every chunk)
 ) -> AsyncGenerator[Dict[str, Any], None]:
     """
     Stream text responses from Anakin API asynchronously, returning OpenAI-compatible format.
@@ -348,6 +584,8 @@ async def stream_text_anakin(
         callback: Optional async callback function to process streaming events.
         thread_id: Optional Anakin thread ID to continue existing conversation.
         app_id: Anakin app/chatbot ID (defaults to settings.ANAKIN_APP_ID).
+        coalesce_ms: If > 0, consecutive chunks arriving within this many milliseconds are merged
+            into a single chunk before the callback/yield.
         
     Yields:
         Dictionary containing event information in OpenAI format for compatibility.
@@ -355,36 +593,22 @@ async def stream_text_anakin(
     logger.info(f"Starting async stream_text_anakin with app_id: {app_id}")
     logger.debug(f"Prompt length: {len(prompt)} characters")
 
-    # --- Ensure event loop has a working ThreadPoolExecutor ---
-    try:
-        loop = asyncio.get_running_loop()
-        executor = getattr(loop, "_default_executor", None)
-        
-        # Create new executor if none exists or if it's been shut down
-        if executor is None or (hasattr(executor, "_shutdown") and executor._shutdown):
-            import concurrent.futures
-            new_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
-            loop.set_default_executor(new_executor)
-            logger.debug("Set/replaced ThreadPoolExecutor for Anakin stream")
-    except Exception as e:
-        logger.debug(f"Could not check/set executor for Anakin: {e}")
-
     try:
         # Check if API key is configured
-        anakin_api_key = os.getenv('ANAKIN_API_KEY')
+        anakin_api_key = _ANAKIN_API_KEY
         if not anakin_api_key:
             logger.error("ANAKIN_API_KEY is not configured in environment")
             raise ValueError("ANAKIN_API_KEY is not configured")
 
         # Get app_id from settings if not provided
         if not app_id:
-            app_id = os.getenv('ANAKIN_APP_ID')
+            app_id = _ANAKIN_APP_ID
             if not app_id:
                 logger.error("ANAKIN_APP_ID is not configured in environment and not provided")
                 raise ValueError("ANAKIN_APP_ID is not configured")
 
         anakin_base_url = "https://api.anakin.ai"
-        api_version = os.getenv('ANAKIN_API_VERSION', '2024-05-06')
+        api_version = _ANAKIN_API_VERSION
 
         # Prepare content from prompt, system_prompt, and messages
         content = ""
@@ -422,100 +646,93 @@ async def stream_text_anakin(
         logger.info("Starting async stream with Anakin API")
         logger.debug(f"Anakin request payload (content length: {len(payload['content'])})")
 
-        # Create a mock OpenAI-style chunk structure
+        # Create a mock OpenAI-style chunk structure. Like OpenAI, every chunk of one completion
+        # shares the same id and creation time, so the clock is read once per stream.
+        chunk_model = model or 'anakin-chatbot'
+        stream_started = time.time()
+        stream_chunk_id = f"anakin-{int(stream_started * 1000)}"
+        stream_created = int(stream_started)
+
         def create_openai_chunk(content_delta: str = "", finish_reason: Optional[str] = None, chunk_id: Optional[str] = None):
             """Create OpenAI-compatible chunk structure"""
-            if not chunk_id:
-                chunk_id = f"anakin-{int(datetime.now().timestamp() * 1000)}"
-                
-            chunk = type('Chunk', (), {
-                'id': chunk_id,
-                'object': 'chat.completion.chunk',
-                'created': int(datetime.now().timestamp()),
-                'model': model or 'anakin-chatbot',
-                'choices': [
-                    type('Choice', (), {
-                        'index': 0,
-                        'delta': type('Delta', (), {
-                            'content': content_delta,
-                            'role': 'assistant' if content_delta else None
-                        })(),
-                        'finish_reason': finish_reason
-                    })()
-                ]
-            })()
-            return chunk
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{anakin_base_url}/v1/chatbots/{app_id}/messages",
-                json=payload,
-                headers=headers
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"Anakin API error {response.status}: {error_text}")
-                    raise Exception(f"Anakin API error {response.status}: {error_text}")
-                
-                logger.info("Anakin stream connection established")
-                
-                # Handle server-sent events
-                accumulated_content = ""
-                async for line in response.content:
-                    line = line.decode('utf-8').strip()
-                    
-                    if line.startswith('data: '):
-                        data_content = line[6:]  # Remove 'data: ' prefix
-                        
-                        if data_content == '[DONE]':
-                            # Stream finished
-                            final_chunk = create_openai_chunk(finish_reason='stop')
-                            if callback:
-                                await callback(final_chunk)
-                            yield final_chunk
-                            break
-                            
-                        try:
-                            # Try to parse as JSON
-                            event_data = json.loads(data_content)
-                            
-                            # Extract content delta
-                            if isinstance(event_data, dict):
-                                if 'content' in event_data:
-                                    # Full content response
-                                    new_content = event_data['content']
-                                    content_delta = new_content[len(accumulated_content):]
-                                    accumulated_content = new_content
-                                elif 'delta' in event_data:
-                                    # Delta response
-                                    content_delta = event_data['delta']
-                                    accumulated_content += content_delta
-                                else:
-                                    # Other event types, send as empty delta
-                                    content_delta = ""
-                                    
-                                # Create OpenAI-compatible chunk
-                                chunk = create_openai_chunk(content_delta)
-                                
-                                if callback:
-                                    await callback(chunk)
-                                yield chunk
-                                
-                        except json.JSONDecodeError:
-                            # Not JSON, might be plain text delta
-                            if data_content:
-                                chunk = create_openai_chunk(data_content)
-                                if callback:
-                                    await callback(chunk)
-                                yield chunk
-                    
-                    elif line.startswith('event: ') or line == '':
-                        # SSE event type or empty line, ignore
-                        continue
-                        
-                logger.info("Anakin stream completed successfully")
-
-    except Exception as e:
+            return _Chunk(
+                id=chunk_id or stream_chunk_id,
+                object='chat.completion.chunk',
+                created=stream_created,
+                model=chunk_model,
+                choices=[_Choice(0, _Delta(content_delta, 'assistant' if content_delta else None), finish_reason)]
+            )
+
+        async def read_events(response: aiohttp.ClientResponse) -> AsyncGenerator[Any, None]:
+            """Translate the Anakin server-sent events into OpenAI-compatible chunks"""
+            # Only the length of the content seen so far is needed to slice out new deltas
+            accumulated_len = 0
+            while True:
+                line = await response.content.readline()
+                if not line:
+                    break
+                # Anything other than a data line ('event: ' lines, blank keep-alives) is ignored
+                if not line.startswith(_SSE_DATA_PREFIX):
+                    continue
+                data_content = line[6:].rstrip(b"\r\n")  # Remove 'data: ' prefix and line ending, kept as bytes
+
+                if data_content == _SSE_DONE:
+                    # Stream finished
+                    yield create_openai_chunk(finish_reason='stop')
+                    return
+
+                try:
+                    # Try to parse as JSON
+                    event_data = _json_loads(data_content)
+                except json.JSONDecodeError:
+                    # Not JSON, might be plain text delta
+                    if data_content:
+                        yield create_openai_chunk(data_content.decode('utf-8'))
+                    continue
+
+                # Extract content delta
+                if isinstance(event_data, dict):
+                    if 'content' in event_data:
+                        # Full content response
+                        new_content = event_data['content']
+                        content_delta = new_content[accumulated_len:]
+                        accumulated_len = len(new_content)
+                    elif 'delta' in event_data:
+                        # Delta response
+                        content_delta = event_data['delta']
+                        accumulated_len += len(content_delta)
+                    else:
+                        # Other event types, send as empty delta
+                        content_delta = ""
+
+                    # Create OpenAI-compatible chunk
+                    yield create_openai_chunk(content_delta)
+
+        session = _get_anakin_session()
+        async with session.post(
+            f"{anakin_base_url}/v1/chatbots/{app_id}/messages",
+            json=payload,
+            headers=headers
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"Anakin API error {response.status}: {error_text}")
+                raise Exception(f"Anakin API error {response.status}: {error_text}")
+            
+            logger.info("Anakin stream connection established")
+
+            # Handle server-sent events
+            events = read_events(response)
+            if coalesce_ms > 0:
+                events = _coalesce_chunks(events, coalesce_ms)
+            if callback:
+                events = _dispatch_to_callback(events, callback)
+            async for chunk in events:
+                yield chunk
+
+            logger.info("Anakin stream completed successfully")
+
+    except (aiohttp.ClientError, ValueError) as e:
         logger.error(f"Error in async stream_text_anakin: {str(e)}", exc_info=True)
         raise
 
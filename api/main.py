@@ -1,58 +1,128 @@
-from fastapi import FastAPI, Request, WebSocket
+from fastapi import FastAPI, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from starlette.websockets import WebSocketState
 import logging
 import os
-import json
 import asyncio
+import time
+import orjson
 from contextlib import asynccontextmanager
-from typing import Set
+from typing import Any, Dict, List, Optional, Tuple
 
 
-from routes.mission_planning import router as mission_planning_router
+from routes.mission_planning import router as mission_planning_router, export_service, mission_planning_service
 from debug_utils import set_debug_manager
+from llm import close_clients, install_default_executor
+
+# Run the LLM/SSE streaming paths on uvloop (libuv) when it is available.
+# Installed before the ASGI server creates its loop so every server picks it up.
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    uvloop = None
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 # WebSocket connection manager for debug panel
 class DebugConnectionManager:
-    def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+    def __init__(self, max_pending: int = 1024):
+        # Immutable tuple swapped on connect/disconnect, so broadcasts can iterate it without snapshotting
+        self.active_connections: Tuple[WebSocket, ...] = ()
+        # Pending debug messages, drained in batches by the flusher task
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._flusher_task: Optional[asyncio.Task] = None
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.add(websocket)
-        logger.info(f"Debug WebSocket connected. Total connections: {len(self.active_connections)}")
+        self.active_connections = self.active_connections + (websocket,)
+        logger.debug("Debug WebSocket connected. Total connections: %d", len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
-        logger.info(f"Debug WebSocket disconnected. Total connections: {len(self.active_connections)}")
-
-    async def broadcast_debug(self, message: str, level: str = "info"):
-        if self.active_connections:
-            debug_data = {
-                "timestamp": str(asyncio.get_event_loop().time()),
-                "level": level,
-                "message": message
-            }
-            message_json = json.dumps(debug_data)
-            disconnected = set()
-            
-            for connection in self.active_connections:
-                try:
-                    await connection.send_text(message_json)
-                except Exception as e:
-                    logger.warning(f"Failed to send debug message to WebSocket: {e}")
-                    disconnected.add(connection)
-            
-            # Remove disconnected connections
-            for conn in disconnected:
-                self.active_connections.discard(conn)
+        self.active_connections = tuple(c for c in self.active_connections if c is not websocket)
+        logger.debug("Debug WebSocket disconnected. Total connections: %d", len(self.active_connections))
+
+    def start(self):
+        """Start the background flusher (call from within the running loop)"""
+        if self._flusher_task is None:
+            self._flusher_task = asyncio.get_running_loop().create_task(self._flusher())
+
+    async def stop(self):
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+
+    def broadcast_debug(self, message: str, level: str = "info"):
+        """Queue a debug message for the panel without waiting on any WebSocket"""
+        if not self.active_connections:
+            return
+        # Timestamps are integer epoch milliseconds, which the panel passes straight to new Date()
+        debug_data = {
+            "timestamp": time.time_ns() // 1_000_000,
+            "level": level,
+            "message": message
+        }
+        try:
+            self._queue.put_nowait(debug_data)
+        except asyncio.QueueFull:
+            # Drop the oldest message so the panel keeps showing the most recent output
+            self._queue.get_nowait()
+            self._queue.put_nowait(debug_data)
+
+    async def _flusher(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._send_batch(batch)
+            except Exception as e:
+                logger.warning("Failed to flush debug messages: %s", e)
+
+    async def _send_batch(self, batch: List[Dict[str, Any]]):
+        if not self.active_connections:
+            return
+
+        # Serialize the batch once as a JSON array text frame (the panel JSON.parses strings);
+        # the ASGI send message is built once and shared by every connection.
+        send_message = {
+            "type": "websocket.send",
+            "text": orjson.dumps(batch).decode()
+        }
+
+        # Skip sockets the client has already closed instead of letting their sends raise
+        connections = []
+        failed = set()
+        for connection in self.active_connections:
+            if connection.client_state is WebSocketState.CONNECTED:
+                connections.append(connection)
+            else:
+                failed.add(id(connection))
+
+        # Send to all connections concurrently so one slow client doesn't stall the rest
+        results = await asyncio.gather(
+            *(connection.send(send_message) for connection in connections),
+            return_exceptions=True
+        )
+
+        # Remove closed connections and those whose send failed
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to send debug message to WebSocket: %s", result)
+                failed.add(id(connection))
+        if failed:
+            # Rebuild from the current tuple; connections may have changed while sends were in flight
+            self.active_connections = tuple(c for c in self.active_connections if id(c) not in failed)
 
 debug_manager = DebugConnectionManager()
 
@@ -62,10 +132,16 @@ async def lifespan(app: FastAPI):
     """Handle startup and shutdown events"""
     # Startup
     logger.info("Starting Mission Planning API...")
+    install_default_executor()
+    debug_manager.start()
     set_debug_manager(debug_manager)
     yield
     # Shutdown
     logger.info("Shutting down Mission Planning API...")
+    await debug_manager.stop()
+    await close_clients()
+    await export_service.close()
+    await mission_planning_service.close()
 
 
 # Create FastAPI app
@@ -73,56 +149,68 @@ app = FastAPI(
     title="Mission Planning API",
     description="API for AI-powered drone mission planning",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
+# Frontend URLs; a frozenset so the middleware's per-request origin check is a hash lookup
+_ALLOWED_ORIGINS = frozenset({"http://localhost:3000", "http://localhost:3001"})
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:3001"],  # Frontend URLs
+    allow_origins=_ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"]
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type", "Accept", "Authorization", "X-Request-Id"],
+    expose_headers=["Content-Disposition", "X-Request-Id"],
+    max_age=86400  # Let browsers cache preflight responses for a day
 )
 
 
 # Global exception handler
+# Exception details are only returned to clients when DEBUG is on
+_DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global exception handler caught: {exc}", exc_info=True)
-    return JSONResponse(
-        status_code=500,
-        content={
-            "detail": "An unexpected error occurred",
-            "error": str(exc)
-        }
-    )
+    # Starlette re-raises after this handler, so the server logs the traceback anyway
+    logger.error("Global exception handler caught %s on %s", type(exc).__name__, request.url.path,
+                 exc_info=logger.isEnabledFor(logging.DEBUG))
+    content = {"detail": "An unexpected error occurred"}
+    if _DEBUG:
+        content["error"] = str(exc)
+    return ORJSONResponse(status_code=500, content=content)
 
 
 # Include routers
 app.include_router(mission_planning_router, prefix="/api/v1")
 
 
+# Static payloads for / and /health, encoded once at import
+_ROOT_BYTES = orjson.dumps({
+    "message": "Mission Planning API",
+    "version": "1.0.0",
+    "docs": "/docs",
+    "redoc": "/redoc"
+})
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "service": "mission-planning-api",
+    "version": "1.0.0"
+})
+
+
 # Root endpoint
 @app.get("/")
 async def root():
-    return {
-        "message": "Mission Planning API",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "redoc": "/redoc"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
 # Health check
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "service": "mission-planning-api",
-        "version": "1.0.0"
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 # WebSocket endpoint for debug panel
@@ -131,27 +219,41 @@ async def websocket_debug_endpoint(websocket: WebSocket):
     await debug_manager.connect(websocket)
     try:
         # Send initial connection message
-        await websocket.send_text(json.dumps({
-            "timestamp": str(asyncio.get_event_loop().time()),
+        await websocket.send_text(orjson.dumps({
+            "timestamp": time.time_ns() // 1_000_000,
             "level": "info",
             "message": "🔌 Debug panel connected to API"
-        }))
+        }).decode())
         
-        # Keep connection alive
+        # Keep connection alive; inbound frames are ignored, so read raw ASGI messages without decoding them
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except Exception as e:
-        logger.info(f"Debug WebSocket connection closed: {e}")
+        logger.debug("Debug WebSocket connection closed: %s", e)
     finally:
         debug_manager.disconnect(websocket)
 
 
 if __name__ == "__main__":
     import uvicorn
+
+    # The stat reloader is only wanted while developing (DEV=1). uvicorn can't reload with
+    # multiple workers, so dev runs a single process; otherwise scale out per CPU.
+    # Each worker keeps its own debug WebSocket connections, so the debug panel only sees
+    # messages from the worker it is connected to (run with WEB_CONCURRENCY=1 to see everything).
+    reload = os.getenv("DEV") == "1"
+    workers = 1 if reload else int(os.getenv("WEB_CONCURRENCY") or (os.cpu_count() or 1) * 2 + 1)
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=9000,
-        reload=True,
+        reload=reload,
+        workers=workers,
+        loop="uvloop" if uvloop else "asyncio",
+        http="httptools",
+        ws="websockets",
         log_level="info"
     ) 
\ No newline at end of file
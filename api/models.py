@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
 from typing import List, Dict, Any, Optional, Literal
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 
+import numpy as np
+
 
 class WaypointType(str, Enum):
     WAYPOINT = "waypoint"
@@ -14,12 +16,33 @@ class WaypointType(str, Enum):
 
 
 class Coordinate(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     lat: float = Field(..., ge=-90, le=90, description="Latitude in degrees")
     lng: float = Field(..., ge=-180, le=180, description="Longitude in degrees")
-    alt: Optional[float] = Field(None, ge=0, description="Altitude in meters")
+    alt: float = Field(0.0, ge=0, description="Altitude in meters")
+
+    @field_validator("alt", mode="before")
+    @classmethod
+    def _null_alt_is_ground(cls, value: Any) -> Any:
+        """Accept an explicit null altitude (clients and LLM output send one) as 0"""
+        return 0.0 if value is None else value
+
+
+def _coordinates_to_array(coords) -> np.ndarray:
+    """Pack Coordinates into a contiguous (N, 3) float64 array of [lat, lng, alt]"""
+    array = np.array([(c.lat, c.lng, c.alt) for c in coords], dtype=np.float64)
+    return array.reshape(-1, 3)
+
+
+def _utcnow() -> datetime:
+    """Timezone-aware current UTC time (serialized with an explicit +00:00 offset)"""
+    return datetime.now(timezone.utc)
 
 
 class Waypoint(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str = Field(..., description="Unique waypoint identifier")
     type: WaypointType = Field(WaypointType.WAYPOINT, description="Type of waypoint")
     position: Coordinate
@@ -32,12 +55,16 @@ class Waypoint(BaseModel):
 
 
 class MissionObjective(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     description: str = Field(..., description="Natural language description of the mission objective")
     priority: Literal["low", "medium", "high"] = Field("medium", description="Mission priority")
     constraints: Optional[List[str]] = Field(None, description="List of constraints")
 
 
 class DroneCapabilities(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     max_altitude: float = Field(120, ge=0, description="Maximum altitude in meters")
     max_speed: float = Field(15, ge=0, description="Maximum speed in m/s")
     flight_time: float = Field(30, ge=0, description="Maximum flight time in minutes")
@@ -47,6 +74,8 @@ class DroneCapabilities(BaseModel):
 
 
 class EnvironmentConditions(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     wind_speed: Optional[float] = Field(None, ge=0, description="Wind speed in m/s")
     wind_direction: Optional[float] = Field(None, ge=0, le=360, description="Wind direction in degrees")
     temperature: Optional[float] = Field(None, description="Temperature in Celsius")
@@ -55,6 +84,8 @@ class EnvironmentConditions(BaseModel):
 
 
 class MissionPlanRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     objective: MissionObjective
     start_position: Optional[Coordinate] = Field(None, description="Starting position")
     area_of_interest: Optional[List[Coordinate]] = Field(None, description="Area boundary points")
@@ -64,19 +95,51 @@ class MissionPlanRequest(BaseModel):
     model: Optional[str] = Field(None, description="LLM model to use")
     include_reasoning: bool = Field(False, description="Include reasoning in response")
 
+    # Contiguous (N, 3) lat/lng/alt arrays for vectorized geometry, built on first access
+    _aoi_xyz: Optional[np.ndarray] = PrivateAttr(None)
+    _waypoints_xyz: Optional[np.ndarray] = PrivateAttr(None)
+
+    @property
+    def aoi_xyz(self) -> np.ndarray:
+        """Area of interest as a float64 array of [lat, lng, alt] rows"""
+        if self._aoi_xyz is None:
+            self._aoi_xyz = _coordinates_to_array(self.area_of_interest or [])
+        return self._aoi_xyz
+
+    @property
+    def waypoints_xyz(self) -> np.ndarray:
+        """Existing waypoint positions as a float64 array of [lat, lng, alt] rows"""
+        if self._waypoints_xyz is None:
+            self._waypoints_xyz = _coordinates_to_array(wp.position for wp in self.existing_waypoints or [])
+        return self._waypoints_xyz
+
 
 class MissionPlan(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str = Field(..., description="Unique mission plan identifier")
     name: str = Field(..., description="Mission name")
     description: str = Field(..., description="Mission description")
     waypoints: List[Waypoint] = Field(..., description="Ordered list of waypoints")
     estimated_duration: float = Field(..., description="Estimated mission duration in minutes")
     total_distance: float = Field(..., description="Total distance in meters")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=_utcnow)
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional metadata")
 
+    # Contiguous (N, 3) lat/lng/alt array of the waypoint positions, built on first access
+    _waypoints_xyz: Optional[np.ndarray] = PrivateAttr(None)
+
+    @property
+    def waypoints_xyz(self) -> np.ndarray:
+        """Waypoint positions in order as a float64 array of [lat, lng, alt] rows"""
+        if self._waypoints_xyz is None:
+            self._waypoints_xyz = _coordinates_to_array(wp.position for wp in self.waypoints)
+        return self._waypoints_xyz
+
 
 class MissionPlanResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     success: bool = Field(..., description="Whether plan generation was successful")
     plan: Optional[MissionPlan] = Field(None, description="Generated mission plan")
     reasoning: Optional[str] = Field(None, description="LLM reasoning for the plan")
@@ -84,20 +147,42 @@ class MissionPlanResponse(BaseModel):
     error: Optional[str] = Field(None, description="Error message if generation failed")
 
 
+class ChunkType(str, Enum):
+    REASONING = "reasoning"
+    PLAN = "plan"
+    WAYPOINT = "waypoint"
+    STATUS = "status"
+    ERROR = "error"
+    STRUCTURE_ANALYSIS = "structure_analysis"
+    LOCATION_GEOCODED = "location_geocoded"
+
+
 class StreamingChunk(BaseModel):
-    type: Literal["reasoning", "plan", "waypoint", "status", "error", "structure_analysis", "location_geocoded"] = Field(..., description="Type of streaming chunk")
+    model_config = ConfigDict(frozen=True)
+
+    type: ChunkType = Field(..., description="Type of streaming chunk")
     content: Optional[str] = Field(None, description="Text content for reasoning/status")
     data: Optional[Dict[str, Any]] = Field(None, description="Structured data for plan/waypoint/structure_analysis/location_geocoded")
     sequence: int = Field(..., description="Sequence number for ordering")
     is_final: bool = Field(False, description="Whether this is the final chunk")
 
 
+class ChatRole(str, Enum):
+    SYSTEM = "system"
+    USER = "user"
+    ASSISTANT = "assistant"
+
+
 class ChatMessage(BaseModel):
-    role: Literal["system", "user", "assistant"] = Field(..., description="Message role")
+    model_config = ConfigDict(frozen=True)
+
+    role: ChatRole = Field(..., description="Message role")
     content: str = Field(..., description="Message content")
 
 
 class ChatRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     messages: List[ChatMessage] = Field(..., description="Chat messages")
     context: Optional[Dict[str, Any]] = Field(None, description="Additional context")
     model: Optional[str] = Field(None, description="LLM model to use")
@@ -0,0 +1,95 @@
+from functools import lru_cache
+
+from models import MissionPlan, Waypoint, Coordinate, WaypointType
+
+# Demo mission served by the export endpoints for testing (there is no mission persistence yet)
+DEMO_MISSION_ID = "demo-mission-001"
+
+
+@lru_cache(maxsize=1)
+def get_demo_mission() -> MissionPlan:
+    """
+    Build the demo mission once (covers a larger area, Alcatraz to SFO area).
+    Models are frozen, so the cached instance is safe to share between requests.
+    """
+    waypoints = [
+        Waypoint(
+            id="wp_0",
+            type=WaypointType.TAKEOFF,
+            position=Coordinate(lat=37.8267, lng=-122.4233, alt=10),  # Alcatraz area
+            order=0,
+            name="Takeoff - Alcatraz Area"
+        ),
+        Waypoint(
+            id="wp_1", 
+            type=WaypointType.WAYPOINT,
+            position=Coordinate(lat=37.8085, lng=-122.4099, alt=50),  # North Beach
+            order=1,
+            name="North Beach"
+        ),
+        Waypoint(
+            id="wp_2",
+            type=WaypointType.WAYPOINT, 
+            position=Coordinate(lat=37.7749, lng=-122.4194, alt=50),  # Downtown SF
+            order=2,
+            name="Downtown SF"
+        ),
+        Waypoint(
+            id="wp_3",
+            type=WaypointType.WAYPOINT,
+            position=Coordinate(lat=37.7544, lng=-122.4477, alt=50),  # Golden Gate Park area
+            order=3,
+            name="Golden Gate Park"
+        ),
+        Waypoint(
+            id="wp_4",
+            type=WaypointType.WAYPOINT,
+            position=Coordinate(lat=37.7280, lng=-122.4680, alt=50),  # Sunset District
+            order=4,
+            name="Sunset District"
+        ),
+        Waypoint(
+            id="wp_5",
+            type=WaypointType.WAYPOINT,
+            position=Coordinate(lat=37.7062, lng=-122.4603, alt=50),  # Daly City
+            order=5,
+            name="Daly City"
+        ),
+        Waypoint(
+            id="wp_6",
+            type=WaypointType.WAYPOINT,
+            position=Coordinate(lat=37.6777, lng=-122.4557, alt=50),  # South SF
+            order=6,
+            name="South San Francisco"
+        ),
+        Waypoint(
+            id="wp_7",
+            type=WaypointType.WAYPOINT,
+            position=Coordinate(lat=37.6624, lng=-122.4827, alt=50),  # San Bruno
+            order=7,
+            name="San Bruno"
+        ),
+        Waypoint(
+            id="wp_8",
+            type=WaypointType.WAYPOINT,
+            position=Coordinate(lat=37.6213, lng=-122.3790, alt=50),  # SFO area
+            order=8,
+            name="SFO Area"
+        ),
+        Waypoint(
+            id="wp_9",
+            type=WaypointType.LAND,
+            position=Coordinate(lat=37.6090, lng=-122.3733, alt=0),   # SFO
+            order=9,
+            name="Landing - SFO"
+        )
+    ]
+    
+    return MissionPlan(
+        id=DEMO_MISSION_ID,
+        name="Demo Mission - San Francisco",
+        description="A demonstration mission around San Francisco for testing export functionality",
+        waypoints=waypoints,
+        estimated_duration=15.5,
+        total_distance=2500.0
+    )
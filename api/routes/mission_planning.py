@@ -1,22 +1,128 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import StreamingResponse
-from typing import Dict, Any
-import json
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from typing import Dict, Any, AsyncIterator, Iterator, List, Literal, Optional
+import asyncio
+import hashlib
 import logging
-import os
-import tempfile
+import orjson
 
 from models import (
     MissionPlanRequest, MissionPlanResponse, 
-    ChatRequest, StreamingChunk
+    ChatRequest, StreamingChunk,
+    MissionPlan, Waypoint, Coordinate, WaypointType
 )
 from services.mission_planning import MissionPlanningService
-from services.export import ExportService
-from debug_utils import debug_print
+from services.export import ExportService, GeoTiffCompression
+from routes._demo_mission import DEMO_MISSION_ID, get_demo_mission
+from debug_utils import debug_print, debug_active
+from llm import stream_text, default_model
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/mission-planning", tags=["Mission Planning"])
+router = APIRouter(
+    prefix="/mission-planning",
+    tags=["Mission Planning"],
+    default_response_class=ORJSONResponse
+)
+
+# Map styles accepted by the route image exports; validated by FastAPI from the query string
+MapType = Literal["satellite", "roadmap", "hybrid", "terrain"]
+
+# Cached serializer for streamed chunks; SSE frames are assembled as bytes from these pieces
+_chunk_adapter = TypeAdapter(StreamingChunk)
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+_SSE_BATCH_PREFIX = _SSE_PREFIX + b'{"events":['
+_SSE_BATCH_SUFFIX = b"]}" + _SSE_SUFFIX
+_SSE_DONE_EVENT = _SSE_PREFIX + b'{"event":"done"}' + _SSE_SUFFIX
+_SSE_CHAT_DONE_EVENT = _SSE_PREFIX + b'{"done":true}' + _SSE_SUFFIX
+
+# Adaptive SSE batching: the first item is flushed on its own to keep time-to-first-byte low,
+# then batches grow by _BATCH_GROWTH up to _BATCH_MAX items, each waiting at most _BATCH_FLUSH_MS
+_BATCH_FLUSH_MS = 20
+_BATCH_MIN = 1
+_BATCH_GROWTH = 3
+_BATCH_MAX = 50
+_STREAM_END = object()
+
+
+async def _batched(source: AsyncIterator[Any]) -> AsyncIterator[List[Any]]:
+    """Re-yield items from source as lists, flushing on batch size or the flush deadline"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    error: Optional[BaseException] = None
+
+    async def produce():
+        nonlocal error
+        try:
+            async for item in source:
+                queue.put_nowait(item)
+        except Exception as e:
+            error = e
+        finally:
+            queue.put_nowait(_STREAM_END)
+
+    producer = asyncio.create_task(produce())
+    batch_size = _BATCH_MIN
+    try:
+        finished = False
+        while not finished:
+            item = await queue.get()
+            if item is _STREAM_END:
+                break
+            batch = [item]
+            deadline = loop.time() + _BATCH_FLUSH_MS / 1000
+            while len(batch) < batch_size:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                if item is _STREAM_END:
+                    finished = True
+                    break
+                batch.append(item)
+            yield batch
+            batch_size = min(batch_size * _BATCH_GROWTH, _BATCH_MAX)
+        if error is not None:
+            raise error
+    finally:
+        producer.cancel()
+
+
+def _iter_drone_mission_json(drone_mission: Dict[str, Any]) -> Iterator[bytes]:
+    """Stream a drone mission export as compact JSON, one mission item per chunk"""
+    items = drone_mission["mission"]["items"]
+    # Serialize the envelope with an empty items list and split it around the array
+    envelope = orjson.dumps({
+        **drone_mission,
+        "mission": {**drone_mission["mission"], "items": []}
+    })
+    head, tail = envelope.split(b'"items":[]', 1)
+    yield head + b'"items":['
+    for i, item in enumerate(items):
+        yield orjson.dumps(item) if i == 0 else b"," + orjson.dumps(item)
+    yield b"]" + tail
+
+
+_EXPORT_CHUNK_SIZE = 256 * 1024
+
+# Route images for a given mission and parameters don't change; let browsers and proxies keep them
+_EXPORT_CACHE_HEADERS = {"Cache-Control": "public, max-age=86400"}
+
+
+def _iter_chunks(data: bytes, chunk_size: int = _EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Send a large export body in fixed-size slices rather than one ASGI message"""
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
+
 
 # Initialize services
 mission_planning_service = MissionPlanningService()
@@ -57,38 +163,32 @@ async def generate_mission_plan_stream(request: MissionPlanRequest):
     The response is a Server-Sent Events (SSE) stream.
     """
     logger.info(f"Starting streaming mission plan generation for: {request.objective.description}")
-    debug_print(f"🌐 [API] Received streaming request for: {request.objective.description}")
-    debug_print(f"🔧 [API] Request model: {request.model or 'default'}")
-    debug_print(f"📡 [API] Include reasoning: {request.include_reasoning}")
+    if debug_active():
+        debug_print(f"🌐 [API] Received streaming request for: {request.objective.description}")
+        debug_print(f"🔧 [API] Request model: {request.model or 'default'}")
+        debug_print(f"📡 [API] Include reasoning: {request.include_reasoning}")
     
     async def event_generator():
         chunk_count = 0
-        async for chunk in mission_planning_service.generate_mission_plan(request):
-            chunk_count += 1
-            debug_print(f"📤 [API] Yielding SSE chunk #{chunk_count}: {chunk.type}")
-            
-            # Convert chunk to SSE format with datetime handling
-            event_data = {
-                "event": chunk.type,
-                "data": chunk.dict()
-            }
+        async for batch in _batched(mission_planning_service.generate_mission_plan(request)):
+            events = []
+            # Checked once per batch; skips building a message per chunk when nobody is listening
+            log_debug = debug_active()
+            for chunk in batch:
+                chunk_count += 1
+                if log_debug:
+                    debug_print(f"📤 [API] Yielding SSE chunk #{chunk_count}: {chunk.type.value}")
+                
+                # Serialize with pydantic-core straight to bytes (handles datetimes, enums and nested models)
+                chunk_json = _chunk_adapter.dump_json(chunk)
+                events.append(b'{"event":"' + chunk.type.value.encode() + b'","data":' + chunk_json + b'}')
             
-            # Use Pydantic's JSON serialization to handle datetime objects
-            try:
-                json_data = json.dumps(event_data, default=str)
-            except Exception as e:
-                debug_print(f"❌ [API] JSON serialization error: {e}")
-                # Fallback: convert problematic objects to strings
-                if chunk.data and hasattr(chunk.data, 'dict'):
-                    # If it's a Pydantic model, use its json() method
-                    event_data["data"] = json.loads(chunk.data.json()) if hasattr(chunk.data, 'json') else chunk.dict()
-                json_data = json.dumps(event_data, default=str)
-            
-            yield f"data: {json_data}\n\n"
+            # One SSE frame per batch
+            yield _SSE_BATCH_PREFIX + b','.join(events) + _SSE_BATCH_SUFFIX
         
         debug_print(f"✅ [API] Stream completed. Total chunks: {chunk_count}")
         # Send final done event
-        yield f"data: {json.dumps({'event': 'done'})}\n\n"
+        yield _SSE_DONE_EVENT
     
     return StreamingResponse(
         event_generator(),
@@ -101,6 +201,26 @@ async def generate_mission_plan_stream(request: MissionPlanRequest):
     )
 
 
+_CHAT_SYSTEM_PROMPT = "You are an expert drone mission planner assistant. Help users create, modify, and optimize drone mission plans. Be concise but thorough."
+
+
+async def _iter_deltas(messages: List[Dict[str, str]], model: Optional[str]) -> AsyncIterator[str]:
+    """Yield the non-empty content deltas of a chat completion stream"""
+    async for chunk in stream_text(
+        prompt="",  # Empty prompt since we're using messages
+        messages=messages,
+        model=model or default_model,
+        system_prompt=_CHAT_SYSTEM_PROMPT
+    ):
+        # Convert OpenAI chunk format to our format; chunks without choices (e.g. usage-only) are skipped
+        try:
+            content = chunk.choices[0].delta.content
+        except (AttributeError, IndexError):
+            continue
+        if content:
+            yield content
+
+
 @router.post("/chat")
 async def chat_with_planner(request: ChatRequest):
     """
@@ -112,30 +232,20 @@ async def chat_with_planner(request: ChatRequest):
     logger.info(f"Chat request with {len(request.messages)} messages")
     
     # Build messages for LLM
-    messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+    messages = [{"role": msg.role.value, "content": msg.content} for msg in request.messages]
     
     # Add context if provided
     if request.context:
-        context_message = f"Current context: {json.dumps(request.context)}"
+        context_message = f"Current context: {orjson.dumps(request.context).decode()}"
         messages.insert(0, {"role": "system", "content": context_message})
     
     if request.stream:
         async def chat_generator():
-            from llm import stream_text
+            # Deltas that arrive together are joined into a single content frame
+            async for batch in _batched(_iter_deltas(messages, request.model)):
+                yield _SSE_PREFIX + orjson.dumps({"content": "".join(batch)}) + _SSE_SUFFIX
             
-            async for chunk in stream_text(
-                prompt="",  # Empty prompt since we're using messages
-                messages=messages,
-                model=request.model,
-                system_prompt="You are an expert drone mission planner assistant. Help users create, modify, and optimize drone mission plans. Be concise but thorough."
-            ):
-                # Convert OpenAI chunk format to our format
-                if hasattr(chunk, 'choices') and chunk.choices:
-                    delta = chunk.choices[0].delta
-                    if hasattr(delta, 'content') and delta.content:
-                        yield f"data: {json.dumps({'content': delta.content})}\n\n"
-            
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            yield _SSE_CHAT_DONE_EVENT
         
         return StreamingResponse(
             chat_generator(),
@@ -148,82 +258,85 @@ async def chat_with_planner(request: ChatRequest):
         )
     else:
         # Non-streaming response
-        from llm import stream_text
-        
-        accumulated_response = ""
-        async for chunk in stream_text(
-            prompt="",
-            messages=messages,
-            model=request.model,
-            system_prompt="You are an expert drone mission planner assistant. Help users create, modify, and optimize drone mission plans. Be concise but thorough."
-        ):
-            if hasattr(chunk, 'choices') and chunk.choices:
-                delta = chunk.choices[0].delta
-                if hasattr(delta, 'content') and delta.content:
-                    accumulated_response += delta.content
+        parts: List[str] = []
+        async for content in _iter_deltas(messages, request.model):
+            parts.append(content)
         
-        return {"response": accumulated_response}
+        return {"response": "".join(parts)}
+
+
+# Pre-defined mission templates; the response body and its ETag are computed once at import
+_MISSION_TEMPLATES = [
+    {
+        "id": "survey_grid",
+        "name": "Grid Survey",
+        "description": "Systematic grid pattern for area mapping",
+        "objective": {
+            "description": "Conduct a systematic aerial survey of the specified area using a grid pattern for complete coverage",
+            "priority": "medium",
+            "constraints": ["Maintain constant altitude", "Overlap images by 70%", "Complete within battery limits"]
+        }
+    },
+    {
+        "id": "perimeter_patrol",
+        "name": "Perimeter Patrol",
+        "description": "Security patrol around a defined perimeter",
+        "objective": {
+            "description": "Patrol the perimeter of the specified area for security monitoring",
+            "priority": "high",
+            "constraints": ["Maintain visual line of sight", "Complete circuit every 15 minutes", "Focus cameras outward"]
+        }
+    },
+    {
+        "id": "search_pattern",
+        "name": "Search Pattern",
+        "description": "Expanding square search pattern",
+        "objective": {
+            "description": "Execute an expanding square search pattern to locate target within search area",
+            "priority": "high",
+            "constraints": ["Start from last known position", "Expand search radius systematically", "Maintain low altitude for visibility"]
+        }
+    },
+    {
+        "id": "infrastructure_inspection",
+        "name": "Infrastructure Inspection",
+        "description": "Detailed inspection of infrastructure",
+        "objective": {
+            "description": "Conduct detailed visual inspection of infrastructure capturing all angles and potential issues",
+            "priority": "medium",
+            "constraints": ["Maintain safe distance from structures", "Capture high-resolution imagery", "Document GPS coordinates of issues"]
+        }
+    }
+]
+_TEMPLATES_BYTES = orjson.dumps({"templates": _MISSION_TEMPLATES})
+_TEMPLATES_ETAG = f'"{hashlib.blake2b(_TEMPLATES_BYTES, digest_size=8).hexdigest()}"'
+
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "service": "mission-planning",
+    "version": "1.0.0"
+})
 
 
 @router.get("/templates")
-async def get_mission_templates():
+async def get_mission_templates(request: Request):
     """
     Get pre-defined mission templates for common scenarios.
     """
-    templates = [
-        {
-            "id": "survey_grid",
-            "name": "Grid Survey",
-            "description": "Systematic grid pattern for area mapping",
-            "objective": {
-                "description": "Conduct a systematic aerial survey of the specified area using a grid pattern for complete coverage",
-                "priority": "medium",
-                "constraints": ["Maintain constant altitude", "Overlap images by 70%", "Complete within battery limits"]
-            }
-        },
-        {
-            "id": "perimeter_patrol",
-            "name": "Perimeter Patrol",
-            "description": "Security patrol around a defined perimeter",
-            "objective": {
-                "description": "Patrol the perimeter of the specified area for security monitoring",
-                "priority": "high",
-                "constraints": ["Maintain visual line of sight", "Complete circuit every 15 minutes", "Focus cameras outward"]
-            }
-        },
-        {
-            "id": "search_pattern",
-            "name": "Search Pattern",
-            "description": "Expanding square search pattern",
-            "objective": {
-                "description": "Execute an expanding square search pattern to locate target within search area",
-                "priority": "high",
-                "constraints": ["Start from last known position", "Expand search radius systematically", "Maintain low altitude for visibility"]
-            }
-        },
-        {
-            "id": "infrastructure_inspection",
-            "name": "Infrastructure Inspection",
-            "description": "Detailed inspection of infrastructure",
-            "objective": {
-                "description": "Conduct detailed visual inspection of infrastructure capturing all angles and potential issues",
-                "priority": "medium",
-                "constraints": ["Maintain safe distance from structures", "Capture high-resolution imagery", "Document GPS coordinates of issues"]
-            }
-        }
-    ]
+    if request.headers.get("if-none-match") == _TEMPLATES_ETAG:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": _TEMPLATES_ETAG})
     
-    return {"templates": templates}
+    return Response(
+        content=_TEMPLATES_BYTES,
+        media_type="application/json",
+        headers={"ETag": _TEMPLATES_ETAG}
+    )
 
 
 @router.get("/health")
 async def health_check():
     """Check if the mission planning service is healthy."""
-    return {
-        "status": "healthy",
-        "service": "mission-planning",
-        "version": "1.0.0"
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 @router.post("/export/mission/{mission_id}")
@@ -235,101 +348,17 @@ async def export_mission_for_drone(mission_id: str):
     (QGroundControl/MAVLink compatible) that can be loaded onto drones.
     """
     logger.info(f"Exporting mission {mission_id} for drone")
-    debug_print(f"📋 [EXPORT] Exporting mission {mission_id} for drone")
+    if debug_active():
+        debug_print(f"📋 [EXPORT] Exporting mission {mission_id} for drone")
     
     # For testing, create a demo mission if the demo ID is used
-    if mission_id == "demo-mission-001":
-        from models import MissionPlan, Waypoint, Coordinate, WaypointType
-        from datetime import datetime
-        
-        # Create a demo mission for testing that covers a larger area (Alcatraz to SFO area)
-        demo_waypoints = [
-            Waypoint(
-                id="wp_0",
-                type=WaypointType.TAKEOFF,
-                position=Coordinate(lat=37.8267, lng=-122.4233, alt=10),  # Alcatraz area
-                order=0,
-                name="Takeoff - Alcatraz Area"
-            ),
-            Waypoint(
-                id="wp_1", 
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.8085, lng=-122.4099, alt=50),  # North Beach
-                order=1,
-                name="North Beach"
-            ),
-            Waypoint(
-                id="wp_2",
-                type=WaypointType.WAYPOINT, 
-                position=Coordinate(lat=37.7749, lng=-122.4194, alt=50),  # Downtown SF
-                order=2,
-                name="Downtown SF"
-            ),
-            Waypoint(
-                id="wp_3",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7544, lng=-122.4477, alt=50),  # Golden Gate Park area
-                order=3,
-                name="Golden Gate Park"
-            ),
-            Waypoint(
-                id="wp_4",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7280, lng=-122.4680, alt=50),  # Sunset District
-                order=4,
-                name="Sunset District"
-            ),
-            Waypoint(
-                id="wp_5",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7062, lng=-122.4603, alt=50),  # Daly City
-                order=5,
-                name="Daly City"
-            ),
-            Waypoint(
-                id="wp_6",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6777, lng=-122.4557, alt=50),  # South SF
-                order=6,
-                name="South San Francisco"
-            ),
-            Waypoint(
-                id="wp_7",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6624, lng=-122.4827, alt=50),  # San Bruno
-                order=7,
-                name="San Bruno"
-            ),
-            Waypoint(
-                id="wp_8",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6213, lng=-122.3790, alt=50),  # SFO area
-                order=8,
-                name="SFO Area"
-            ),
-            Waypoint(
-                id="wp_9",
-                type=WaypointType.LAND,
-                position=Coordinate(lat=37.6090, lng=-122.3733, alt=0),   # SFO
-                order=9,
-                name="Landing - SFO"
-            )
-        ]
-        
-        demo_mission = MissionPlan(
-            id=mission_id,
-            name="Demo Mission - San Francisco",
-            description="A demonstration mission around San Francisco for testing export functionality",
-            waypoints=demo_waypoints,
-            estimated_duration=15.5,
-            total_distance=2500.0,
-            created_at=datetime.utcnow()
-        )
+    if mission_id == DEMO_MISSION_ID:
+        demo_mission = get_demo_mission()
         
         drone_mission = await export_service.export_mission_for_drone(demo_mission)
         
         return StreamingResponse(
-            iter([json.dumps(drone_mission, indent=2)]),
+            _iter_drone_mission_json(drone_mission),
             media_type="application/json",
             headers={
                 "Content-Disposition": f"attachment; filename=mission_{mission_id}.plan"
@@ -346,9 +375,10 @@ async def export_mission_for_drone(mission_id: str):
 @router.post("/export/geotiff/{mission_id}")
 async def export_route_geotiff(
     mission_id: str,
-    zoom_level: int = 16,
-    buffer_meters: int = 500,
-    map_type: str = "satellite"
+    zoom_level: int = Query(16, ge=1, le=18),
+    buffer_meters: int = Query(500, ge=50, le=5000),
+    map_type: MapType = Query("satellite"),
+    compression: GeoTiffCompression = Query("deflate")
 ):
     """
     Export route as a GeoTIFF file.
@@ -360,132 +390,33 @@ async def export_route_geotiff(
     - zoom_level: Tile zoom level (higher = more detail, 1-18)
     - buffer_meters: Buffer around route in meters
     - map_type: Type of map ("satellite", "roadmap", "hybrid", "terrain")
+    - compression: GeoTIFF codec ("deflate" and "lzw" are lossless, "jpeg" gives the smallest file)
     """
     logger.info(f"Exporting GeoTIFF for mission {mission_id}")
-    debug_print(f"🗺️ [EXPORT] Generating GeoTIFF for mission {mission_id}")
-    debug_print(f"🔧 [EXPORT] Zoom level: {zoom_level}, Buffer: {buffer_meters}m, Type: {map_type}")
-    
-    # Validate parameters
-    if not (1 <= zoom_level <= 18):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Zoom level must be between 1 and 18"
-        )
-    
-    if not (50 <= buffer_meters <= 5000):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Buffer must be between 50 and 5000 meters"
-        )
-    
-    if map_type not in ["satellite", "roadmap", "hybrid", "terrain"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Map type must be one of: satellite, roadmap, hybrid, terrain"
-        )
+    if debug_active():
+        debug_print(f"🗺️ [EXPORT] Generating GeoTIFF for mission {mission_id}")
+        debug_print(f"🔧 [EXPORT] Zoom level: {zoom_level}, Buffer: {buffer_meters}m, Type: {map_type}")
     
     # For testing, create a demo mission if the demo ID is used
-    if mission_id == "demo-mission-001":
-        from models import MissionPlan, Waypoint, Coordinate, WaypointType
-        from datetime import datetime
-        
-        # Create a demo mission for testing (same as above)
-        demo_waypoints = [
-            Waypoint(
-                id="wp_0",
-                type=WaypointType.TAKEOFF,
-                position=Coordinate(lat=37.8267, lng=-122.4233, alt=10),  # Alcatraz area
-                order=0,
-                name="Takeoff - Alcatraz Area"
-            ),
-            Waypoint(
-                id="wp_1", 
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.8085, lng=-122.4099, alt=50),  # North Beach
-                order=1,
-                name="North Beach"
-            ),
-            Waypoint(
-                id="wp_2",
-                type=WaypointType.WAYPOINT, 
-                position=Coordinate(lat=37.7749, lng=-122.4194, alt=50),  # Downtown SF
-                order=2,
-                name="Downtown SF"
-            ),
-            Waypoint(
-                id="wp_3",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7544, lng=-122.4477, alt=50),  # Golden Gate Park area
-                order=3,
-                name="Golden Gate Park"
-            ),
-            Waypoint(
-                id="wp_4",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7280, lng=-122.4680, alt=50),  # Sunset District
-                order=4,
-                name="Sunset District"
-            ),
-            Waypoint(
-                id="wp_5",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7062, lng=-122.4603, alt=50),  # Daly City
-                order=5,
-                name="Daly City"
-            ),
-            Waypoint(
-                id="wp_6",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6777, lng=-122.4557, alt=50),  # South SF
-                order=6,
-                name="South San Francisco"
-            ),
-            Waypoint(
-                id="wp_7",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6624, lng=-122.4827, alt=50),  # San Bruno
-                order=7,
-                name="San Bruno"
-            ),
-            Waypoint(
-                id="wp_8",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6213, lng=-122.3790, alt=50),  # SFO area
-                order=8,
-                name="SFO Area"
-            ),
-            Waypoint(
-                id="wp_9",
-                type=WaypointType.LAND,
-                position=Coordinate(lat=37.6090, lng=-122.3733, alt=0),   # SFO
-                order=9,
-                name="Landing - SFO"
-            )
-        ]
-        
-        demo_mission = MissionPlan(
-            id=mission_id,
-            name="Demo Mission - San Francisco",
-            description="A demonstration mission around San Francisco for testing export functionality",
-            waypoints=demo_waypoints,
-            estimated_duration=15.5,
-            total_distance=2500.0,
-            created_at=datetime.utcnow()
-        )
+    if mission_id == DEMO_MISSION_ID:
+        demo_mission = get_demo_mission()
         
         try:
             geotiff_bytes = await export_service.generate_route_geotiff(
                 demo_mission, 
                 zoom_level=zoom_level, 
                 buffer_meters=buffer_meters,
-                map_type=map_type
+                map_type=map_type,
+                compression=compression
             )
             
             return StreamingResponse(
-                iter([geotiff_bytes]),
+                _iter_chunks(geotiff_bytes),
                 media_type="image/tiff",
                 headers={
-                    "Content-Disposition": f"attachment; filename=route_{mission_id}_{map_type}.geotiff"
+                    "Content-Disposition": f"attachment; filename=route_{mission_id}_{map_type}.geotiff",
+                    "Content-Length": str(len(geotiff_bytes)),
+                    **_EXPORT_CACHE_HEADERS
                 }
             )
         except ValueError as e:
@@ -512,9 +443,9 @@ async def export_route_geotiff(
 @router.post("/export/png/{mission_id}")
 async def export_route_png(
     mission_id: str,
-    zoom_level: int = 16,
-    buffer_meters: int = 500,
-    map_type: str = "satellite"
+    zoom_level: int = Query(16, ge=1, le=18),
+    buffer_meters: int = Query(500, ge=50, le=5000),
+    map_type: MapType = Query("satellite")
 ):
     """
     Export route as a PNG image file.
@@ -528,116 +459,13 @@ async def export_route_png(
     - map_type: Type of map ("satellite", "roadmap", "hybrid", "terrain")
     """
     logger.info(f"Exporting PNG for mission {mission_id}")
-    debug_print(f"🖼️ [EXPORT] Generating PNG for mission {mission_id}")
-    debug_print(f"🔧 [EXPORT] Zoom level: {zoom_level}, Buffer: {buffer_meters}m, Type: {map_type}")
-    
-    # Validate parameters
-    if not (1 <= zoom_level <= 18):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Zoom level must be between 1 and 18"
-        )
-    
-    if not (50 <= buffer_meters <= 5000):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Buffer must be between 50 and 5000 meters"
-        )
-    
-    if map_type not in ["satellite", "roadmap", "hybrid", "terrain"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Map type must be one of: satellite, roadmap, hybrid, terrain"
-        )
+    if debug_active():
+        debug_print(f"🖼️ [EXPORT] Generating PNG for mission {mission_id}")
+        debug_print(f"🔧 [EXPORT] Zoom level: {zoom_level}, Buffer: {buffer_meters}m, Type: {map_type}")
     
     # For testing, create a demo mission if the demo ID is used
-    if mission_id == "demo-mission-001":
-        from models import MissionPlan, Waypoint, Coordinate, WaypointType
-        from datetime import datetime
-        
-        # Create a demo mission for testing (same as GeoTIFF)
-        demo_waypoints = [
-            Waypoint(
-                id="wp_0",
-                type=WaypointType.TAKEOFF,
-                position=Coordinate(lat=37.8267, lng=-122.4233, alt=10),  # Alcatraz area
-                order=0,
-                name="Takeoff - Alcatraz Area"
-            ),
-            Waypoint(
-                id="wp_1", 
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.8085, lng=-122.4099, alt=50),  # North Beach
-                order=1,
-                name="North Beach"
-            ),
-            Waypoint(
-                id="wp_2",
-                type=WaypointType.WAYPOINT, 
-                position=Coordinate(lat=37.7749, lng=-122.4194, alt=50),  # Downtown SF
-                order=2,
-                name="Downtown SF"
-            ),
-            Waypoint(
-                id="wp_3",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7544, lng=-122.4477, alt=50),  # Golden Gate Park area
-                order=3,
-                name="Golden Gate Park"
-            ),
-            Waypoint(
-                id="wp_4",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7280, lng=-122.4680, alt=50),  # Sunset District
-                order=4,
-                name="Sunset District"
-            ),
-            Waypoint(
-                id="wp_5",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7062, lng=-122.4603, alt=50),  # Daly City
-                order=5,
-                name="Daly City"
-            ),
-            Waypoint(
-                id="wp_6",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6777, lng=-122.4557, alt=50),  # South SF
-                order=6,
-                name="South San Francisco"
-            ),
-            Waypoint(
-                id="wp_7",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6624, lng=-122.4827, alt=50),  # San Bruno
-                order=7,
-                name="San Bruno"
-            ),
-            Waypoint(
-                id="wp_8",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6213, lng=-122.3790, alt=50),  # SFO area
-                order=8,
-                name="SFO Area"
-            ),
-            Waypoint(
-                id="wp_9",
-                type=WaypointType.LAND,
-                position=Coordinate(lat=37.6090, lng=-122.3733, alt=0),   # SFO
-                order=9,
-                name="Landing - SFO"
-            )
-        ]
-        
-        demo_mission = MissionPlan(
-            id=mission_id,
-            name="Demo Mission - San Francisco",
-            description="A demonstration mission around San Francisco for testing export functionality",
-            waypoints=demo_waypoints,
-            estimated_duration=15.5,
-            total_distance=2500.0,
-            created_at=datetime.utcnow()
-        )
+    if mission_id == DEMO_MISSION_ID:
+        demo_mission = get_demo_mission()
         
         try:
             png_bytes = await export_service.generate_route_png(
@@ -648,10 +476,12 @@ async def export_route_png(
             )
             
             return StreamingResponse(
-                iter([png_bytes]),
+                _iter_chunks(png_bytes),
                 media_type="image/png",
                 headers={
-                    "Content-Disposition": f"attachment; filename=route_{mission_id}_{map_type}.png"
+                    "Content-Disposition": f"attachment; filename=route_{mission_id}_{map_type}.png",
+                    "Content-Length": str(len(png_bytes)),
+                    **_EXPORT_CACHE_HEADERS
                 }
             )
         except ValueError as e:
@@ -683,9 +513,6 @@ async def test_geotiff_georeferencing():
     """
     debug_print("🧪 [TEST] Creating test GeoTIFF to verify georeferencing")
     
-    from models import MissionPlan, Waypoint, Coordinate, WaypointType
-    from datetime import datetime
-    
     # Create a minimal test mission
     test_waypoints = [
         Waypoint(
@@ -710,8 +537,7 @@ async def test_geotiff_georeferencing():
         description="Test mission for GeoTIFF georeferencing verification",
         waypoints=test_waypoints,
         estimated_duration=5.0,
-        total_distance=1000.0,
-        created_at=datetime.utcnow()
+        total_distance=1000.0
     )
     
     try:
@@ -723,16 +549,9 @@ async def test_geotiff_georeferencing():
             map_type="satellite"
         )
         
-        # Save temporarily to verify georeferencing
-        with tempfile.NamedTemporaryFile(suffix='.geotiff', delete=False) as temp_file:
-            temp_file.write(geotiff_bytes)
-            temp_path = temp_file.name
-        
-        # Verify georeferencing
-        verification_info = export_service.verify_geotiff_georeferencing(temp_path)
-        
-        # Clean up
-        os.unlink(temp_path)
+        # Verify georeferencing straight from memory
+        # Reading the GeoTIFF back through GDAL is blocking; keep it off the event loop like the encode
+        verification_info = await asyncio.to_thread(export_service.verify_geotiff_georeferencing, geotiff_bytes)
         
         debug_print(f"✅ [TEST] GeoTIFF verification completed successfully")
         debug_print(f"📊 [TEST] CRS: {verification_info.get('crs')}")
@@ -764,101 +583,15 @@ async def export_mission_waypoints(mission_id: str):
     compatible .waypoints format, which is a tab-separated text file.
     """
     logger.info(f"Exporting mission {mission_id} as .waypoints file")
-    debug_print(f"📋 [EXPORT] Exporting mission {mission_id} as .waypoints file")
+    if debug_active():
+        debug_print(f"📋 [EXPORT] Exporting mission {mission_id} as .waypoints file")
     
     # For testing, create a demo mission if the demo ID is used
-    if mission_id == "demo-mission-001":
-        from models import MissionPlan, Waypoint, Coordinate, WaypointType
-        from datetime import datetime
-        
-        # Create a demo mission for testing that covers a larger area (Alcatraz to SFO area)
-        demo_waypoints = [
-            Waypoint(
-                id="wp_0",
-                type=WaypointType.TAKEOFF,
-                position=Coordinate(lat=37.8267, lng=-122.4233, alt=10),  # Alcatraz area
-                order=0,
-                name="Takeoff - Alcatraz Area"
-            ),
-            Waypoint(
-                id="wp_1", 
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.8085, lng=-122.4099, alt=50),  # North Beach
-                order=1,
-                name="North Beach"
-            ),
-            Waypoint(
-                id="wp_2",
-                type=WaypointType.WAYPOINT, 
-                position=Coordinate(lat=37.7749, lng=-122.4194, alt=50),  # Downtown SF
-                order=2,
-                name="Downtown SF"
-            ),
-            Waypoint(
-                id="wp_3",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7544, lng=-122.4477, alt=50),  # Golden Gate Park area
-                order=3,
-                name="Golden Gate Park"
-            ),
-            Waypoint(
-                id="wp_4",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7280, lng=-122.4680, alt=50),  # Sunset District
-                order=4,
-                name="Sunset District"
-            ),
-            Waypoint(
-                id="wp_5",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.7062, lng=-122.4603, alt=50),  # Daly City
-                order=5,
-                name="Daly City"
-            ),
-            Waypoint(
-                id="wp_6",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6777, lng=-122.4557, alt=50),  # South SF
-                order=6,
-                name="South San Francisco"
-            ),
-            Waypoint(
-                id="wp_7",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6624, lng=-122.4827, alt=50),  # San Bruno
-                order=7,
-                name="San Bruno"
-            ),
-            Waypoint(
-                id="wp_8",
-                type=WaypointType.WAYPOINT,
-                position=Coordinate(lat=37.6213, lng=-122.3790, alt=50),  # SFO area
-                order=8,
-                name="SFO Area"
-            ),
-            Waypoint(
-                id="wp_9",
-                type=WaypointType.LAND,
-                position=Coordinate(lat=37.6090, lng=-122.3733, alt=0),   # SFO
-                order=9,
-                name="Landing - SFO"
-            )
-        ]
-        
-        demo_mission = MissionPlan(
-            id=mission_id,
-            name="Demo Mission - San Francisco",
-            description="A demonstration mission around San Francisco for testing export functionality",
-            waypoints=demo_waypoints,
-            estimated_duration=15.5,
-            total_distance=2500.0,
-            created_at=datetime.utcnow()
-        )
-        
-        waypoints_content = export_service.export_mission_waypoints(demo_mission)
+    if mission_id == DEMO_MISSION_ID:
+        demo_mission = get_demo_mission()
         
         return StreamingResponse(
-            iter([waypoints_content]),
+            export_service.iter_mission_waypoints_bytes(demo_mission),
             media_type="text/plain",
             headers={
                 "Content-Disposition": f"attachment; filename=mission_{mission_id}.waypoints"
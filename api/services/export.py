@@ -1,16 +1,19 @@
 import os
 import json
-import tempfile
 import asyncio
-from typing import List, Optional, Tuple, Dict, Any
+import uuid
+from typing import List, Literal, Optional, Tuple, Dict, Any, Iterator, Union
 from io import BytesIO
 import logging
+from collections import OrderedDict
+from pathlib import Path
 
 import httpx
 import mercantile
 import rasterio
 from rasterio.transform import from_bounds
 from rasterio.crs import CRS
+from rasterio.io import MemoryFile
 import numpy as np
 from PIL import Image
 
@@ -19,11 +22,110 @@ from models import MissionPlan, Waypoint
 logger = logging.getLogger(__name__)
 
 
+# Concurrent tile requests per export; bounded to stay clear of tile server rate limits
+_TILE_CONCURRENCY = 16
+
+# Tiles kept in memory across exports (~50 KB each, so roughly 100 MB at the default)
+_TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE") or 2048)
+
+# Stitched rasters kept in memory so PNG and GeoTIFF exports of the same route share one stitch
+_STITCH_CACHE_SIZE = int(os.getenv("STITCH_CACHE_SIZE") or 4)
+
+# Google Maps tile layer codes per map type
+_TILE_LAYERS = {
+    "satellite": "s",      # Satellite imagery
+    "roadmap": "m",        # Standard roadmap
+    "hybrid": "y",         # Hybrid (satellite + roads/labels)
+    "terrain": "t"         # Terrain
+}
+
+# Google Maps tiles are 256x256 pixels
+_TILE_SIZE = 256
+
+# Degrees of latitude per meter (1 degree latitude ≈ 111,320 meters)
+_DEG_PER_METER = 1 / 111320
+
+# Tiles persisted on disk so repeat exports survive restarts and are shared between workers. Opt-in:
+# nothing evicts old tiles, so the directory's size is left to the deployment
+_TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", "")
+
+# GeoTIFF compression codecs accepted by generate_route_geotiff
+GeoTiffCompression = Literal["jpeg", "deflate", "lzw"]
+
+# GDAL creation options per codec. DEFLATE/LZW are lossless and, with GDAL's worker threads, encode faster
+# than JPEG on multi-core hosts at the cost of larger files; JPEG stays available for the smallest output
+_GEOTIFF_COMPRESSION_OPTIONS: Dict[str, Dict[str, Any]] = {
+    "jpeg": {"compress": "jpeg"},
+    "deflate": {"compress": "deflate", "predictor": 2, "zlevel": 6},
+    "lzw": {"compress": "lzw", "predictor": 2},
+}
+
+# MAVLink enum values used by the QGroundControl .plan export
+_MAV_FRAME_GLOBAL_RELATIVE_ALT = 3
+_MAV_MISSION_TYPE_MISSION = 0
+
+# .waypoints mission line: seq current frame command param1 param2 param3 param4 x y z autocontinue
+# current=0 (only home has current=1), frame=3 (MAV_FRAME_GLOBAL_RELATIVE_ALT), autocontinue=1
+# Positional %-formatting of one tuple is markedly cheaper per row than str.format with keyword arguments
+_WAYPOINT_LINE = "%d\t0\t3\t%d\t%.6f\t%.6f\t%.6f\t%.6f\t%.8f\t%.8f\t%.6f\t1\n"
+
+
+def _no_params(waypoint: Waypoint) -> Tuple[float, float, float, float]:
+    return 0, 0, 0, 0
+
+
+# MAVLink command and param1-4 per waypoint type
+_WAYPOINT_TABLE = {
+    # MAV_CMD_NAV_TAKEOFF: min pitch, -, -, yaw
+    "takeoff": (22, _no_params),
+    # MAV_CMD_NAV_WAYPOINT: hold time (s), acceptance radius (0 = default), pass through, yaw
+    "waypoint": (16, lambda wp: (wp.loiter_time or 0, 0, 0, 0)),
+    # MAV_CMD_NAV_LAND: abort altitude, precision land mode, -, yaw
+    "land": (21, _no_params),
+    # MAV_CMD_NAV_LOITER_UNLIM: loiter time (s), -, loiter radius (0 = default), turn direction
+    "loiter": (17, lambda wp: (wp.loiter_time or 10, 0, wp.radius or 0, 0)),
+    # MAV_CMD_NAV_LOITER_TURNS: radius (m), number of turns, -, exit location
+    "orbit": (18, lambda wp: (wp.radius or 10, wp.loiter_time or 1, 0, 0)),
+    # Surveys are flown as plain MAV_CMD_NAV_WAYPOINT
+    "survey": (16, _no_params),
+}
+_DEFAULT_WAYPOINT_ENTRY = (16, _no_params)
+
+
 class ExportService:
     def __init__(self):
         self.google_maps_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
         if not self.google_maps_api_key:
             logger.warning("GOOGLE_MAPS_API_KEY not found in environment variables")
+        # Shared tile client, created on first use so connections (and TLS sessions) are reused across exports
+        self._tile_client: Optional[httpx.AsyncClient] = None
+        # Encoded tile bytes keyed by (z, x, y, layer), most recently used last
+        self._tile_cache: "OrderedDict[Tuple[int, int, int, str], bytes]" = OrderedDict()
+        # Stitched rasters and their bounds keyed by (zoom, layer, tile range), most recently used last
+        self._stitch_cache: "OrderedDict[Tuple[int, str, int, int, int, int], Tuple[np.ndarray, Dict[str, float]]]" = OrderedDict()
+        self._tile_cache_dir: Optional[Path] = Path(_TILE_CACHE_DIR) if _TILE_CACHE_DIR else None
+
+    def _get_tile_client(self) -> httpx.AsyncClient:
+        """Return the shared tile HTTP client, creating it on first use."""
+        if self._tile_client is None or self._tile_client.is_closed:
+            self._tile_client = httpx.AsyncClient(
+                # HTTP/2 multiplexes the concurrent tile requests over a few connections per mt host
+                http2=True,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                # Keep every connection alive between exports; requests are spread over four mt hosts
+                limits=httpx.Limits(
+                    max_connections=_TILE_CONCURRENCY * 2,
+                    max_keepalive_connections=_TILE_CONCURRENCY * 2,
+                    keepalive_expiry=60.0,
+                ),
+            )
+        return self._tile_client
+
+    async def close(self):
+        """Close the shared tile client. Call once on application shutdown."""
+        if self._tile_client is not None:
+            await self._tile_client.aclose()
+            self._tile_client = None
 
     async def export_mission_for_drone(self, mission_plan: MissionPlan) -> Dict[str, Any]:
         """
@@ -33,12 +135,11 @@ class ExportService:
         logger.info(f"Exporting mission plan {mission_plan.id} for drone")
         
         # Convert waypoints to a common drone format (MAVLink-compatible)
-        drone_waypoints = []
-        for waypoint in mission_plan.waypoints:
-            drone_waypoint = {
+        drone_waypoints = [
+            {
                 "seq": waypoint.order,
-                "frame": 3,  # MAV_FRAME_GLOBAL_RELATIVE_ALT
-                "command": self._get_mavlink_command(waypoint.type),
+                "frame": _MAV_FRAME_GLOBAL_RELATIVE_ALT,
+                "command": _WAYPOINT_TABLE.get(waypoint.type, _DEFAULT_WAYPOINT_ENTRY)[0],
                 "current": 1 if waypoint.order == 0 else 0,
                 "autocontinue": 1,
                 "param1": waypoint.loiter_time or 0,
@@ -48,9 +149,10 @@ class ExportService:
                 "x": waypoint.position.lat,
                 "y": waypoint.position.lng,
                 "z": waypoint.position.alt or 30,  # Default altitude
-                "mission_type": 0
+                "mission_type": _MAV_MISSION_TYPE_MISSION
             }
-            drone_waypoints.append(drone_waypoint)
+            for waypoint in mission_plan.waypoints
+        ]
         
         # Create mission file structure
         mission_export = {
@@ -82,18 +184,6 @@ class ExportService:
         
         return mission_export
 
-    def _get_mavlink_command(self, waypoint_type: str) -> int:
-        """Convert waypoint type to MAVLink command number."""
-        mavlink_commands = {
-            "takeoff": 22,      # MAV_CMD_NAV_TAKEOFF
-            "waypoint": 16,     # MAV_CMD_NAV_WAYPOINT
-            "land": 21,         # MAV_CMD_NAV_LAND
-            "loiter": 17,       # MAV_CMD_NAV_LOITER_UNLIM
-            "orbit": 18,        # MAV_CMD_NAV_LOITER_TURNS
-            "survey": 16        # MAV_CMD_NAV_WAYPOINT (treated as waypoint)
-        }
-        return mavlink_commands.get(waypoint_type, 16)
-
     def export_mission_waypoints(self, mission_plan: MissionPlan) -> str:
         """
         Export mission plan as a .waypoints file (Mission Planner format).
@@ -107,12 +197,40 @@ class ExportService:
         Returns:
             str: Waypoints file content as string
         """
-        logger.info(f"Exporting mission plan {mission_plan.id} as .waypoints file")
+        return "".join(self.iter_mission_waypoints(mission_plan))
+
+    def iter_mission_waypoints_bytes(self, mission_plan: MissionPlan, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Yield the .waypoints file as ASCII-encoded chunks of roughly chunk_size bytes.
+        
+        Grouping lines keeps a streaming response from sending one tiny body message per waypoint.
+        """
+        lines: List[str] = []
+        size = 0
+        for line in self.iter_mission_waypoints(mission_plan):
+            lines.append(line)
+            size += len(line)
+            if size >= chunk_size:
+                yield "".join(lines).encode("ascii")
+                lines.clear()
+                size = 0
+        if lines:
+            yield "".join(lines).encode("ascii")
+
+    def iter_mission_waypoints(self, mission_plan: MissionPlan) -> Iterator[str]:
+        """
+        Yield the .waypoints file one newline-terminated line at a time.
         
-        lines = []
+        Args:
+            mission_plan: The mission plan containing waypoints
+            
+        Yields:
+            str: The header line, the home position, then one line per waypoint
+        """
+        logger.info(f"Exporting mission plan {mission_plan.id} as .waypoints file")
         
         # Add header (QGC WPL version 110 is standard)
-        lines.append("QGC WPL 110")
+        yield "QGC WPL 110\n"
         
         # Add home position as first waypoint (seq 0)
         # Use the first waypoint position as home, or default coordinates if no waypoints
@@ -126,65 +244,26 @@ class ExportService:
             home_lat, home_lng, home_alt = 37.7749, -122.4194, 0
         
         # Home position (seq=0, current=1, frame=0 for absolute, command=16 for waypoint)
-        home_line = f"0\t1\t0\t16\t0.000000\t0.000000\t0.000000\t0.000000\t{home_lat:.8f}\t{home_lng:.8f}\t{home_alt:.6f}\t1"
-        lines.append(home_line)
+        yield f"0\t1\t0\t16\t0.000000\t0.000000\t0.000000\t0.000000\t{home_lat:.8f}\t{home_lng:.8f}\t{home_alt:.6f}\t1\n"
         
         # Add mission waypoints (starting from seq 1)
-        for i, waypoint in enumerate(mission_plan.waypoints, 1):
-            seq = i
-            current = 0  # Only home position has current=1
-            frame = 3    # MAV_FRAME_GLOBAL_RELATIVE_ALT (relative to home altitude)
-            command = self._get_mavlink_command(waypoint.type.value if hasattr(waypoint.type, 'value') else str(waypoint.type))
+        for seq, waypoint in enumerate(mission_plan.waypoints, 1):
+            # WaypointType is a str enum, so it hashes and compares like its value; no .value lookup needed
+            command, params = _WAYPOINT_TABLE.get(waypoint.type, _DEFAULT_WAYPOINT_ENTRY)
+            position = waypoint.position
             
-            # Set parameters based on waypoint type
-            param1 = param2 = param3 = param4 = 0.0
-            
-            if waypoint.type in ['takeoff']:
-                param1 = 0  # Minimum pitch (for fixed wing)
-                param2 = 0  # Empty
-                param3 = 0  # Empty  
-                param4 = 0  # Yaw angle (NaN for default)
-            elif waypoint.type in ['land']:
-                param1 = 0  # Abort altitude (0 = use default)
-                param2 = 0  # Precision land mode
-                param3 = 0  # Empty
-                param4 = 0  # Yaw angle
-            elif waypoint.type in ['waypoint']:
-                param1 = waypoint.loiter_time or 0  # Hold time in seconds
-                param2 = 0  # Acceptance radius in meters (0 = use default)
-                param3 = 0  # Pass through (0) or orbit to reach (1)
-                param4 = 0  # Yaw angle in degrees (NaN for default)
-            elif waypoint.type in ['loiter']:
-                param1 = waypoint.loiter_time or 10  # Loiter time in seconds (0 = unlimited)
-                param2 = 0  # Empty
-                param3 = waypoint.radius or 0  # Loiter radius (0 = use default)
-                param4 = 0  # Forward moving (1) or direction of vehicle turn (0=clockwise, 1=counter-clockwise)
-            elif waypoint.type in ['orbit']:
-                param1 = waypoint.radius or 10  # Radius in meters
-                param2 = waypoint.loiter_time or 1  # Number of turns (0 = unlimited)
-                param3 = 0  # Empty
-                param4 = 0  # Exit location (0=center, 1=exit_location)
-            
-            lat = waypoint.position.lat
-            lng = waypoint.position.lng
-            alt = waypoint.position.alt or 50  # Default altitude if not specified
-            autocontinue = 1
-            
-            # Format: seq current frame command param1 param2 param3 param4 x y z autocontinue
-            waypoint_line = f"{seq}\t{current}\t{frame}\t{command}\t{param1:.6f}\t{param2:.6f}\t{param3:.6f}\t{param4:.6f}\t{lat:.8f}\t{lng:.8f}\t{alt:.6f}\t{autocontinue}"
-            lines.append(waypoint_line)
+            # Default altitude if not specified
+            yield _WAYPOINT_LINE % (seq, command, *params(waypoint), position.lat, position.lng, position.alt or 50)
         
-        waypoints_content = "\n".join(lines)
         logger.info(f"Generated .waypoints file with {len(mission_plan.waypoints) + 1} entries (including home)")
-        
-        return waypoints_content
 
     async def generate_route_geotiff(
         self, 
         mission_plan: MissionPlan, 
         zoom_level: int = 16,
         buffer_meters: int = 500,
-        map_type: str = "satellite"
+        map_type: str = "satellite",
+        compression: GeoTiffCompression = "deflate"
     ) -> bytes:
         """
         Generate a GeoTIFF of the route using Google Maps tiles.
@@ -194,6 +273,7 @@ class ExportService:
             zoom_level: Tile zoom level (higher = more detailed)
             buffer_meters: Buffer around route in meters
             map_type: Type of map ("satellite", "roadmap", "hybrid", "terrain")
+            compression: GeoTIFF codec ("deflate" and "lzw" are lossless, "jpeg" is smallest)
         
         Returns:
             bytes: GeoTIFF file contents
@@ -203,9 +283,32 @@ class ExportService:
         
         logger.info(f"Generating GeoTIFF for mission {mission_plan.id} at zoom {zoom_level}")
         
+        stitched, image_bounds = await self._build_stitched(mission_plan, zoom_level, buffer_meters, map_type)
+        
+        # Encode the GeoTIFF in a worker thread; it is CPU-bound and would block the event loop
+        geotiff_bytes = await asyncio.to_thread(self._create_geotiff, stitched, image_bounds, compression)
+        
+        logger.info("GeoTIFF generation completed")
+        return geotiff_bytes
+
+    async def _build_stitched(
+        self,
+        mission_plan: MissionPlan,
+        zoom_level: int,
+        buffer_meters: int,
+        map_type: str
+    ) -> Tuple[np.ndarray, Dict[str, float]]:
+        """
+        Download and stitch the map tiles covering a mission's route.
+        
+        Stitched rasters are cached by tile range and map type, so back-to-back PNG and GeoTIFF
+        exports of the same route share one download and stitch.
+        
+        Returns:
+            Tuple of the read-only stitched array and its geographic bounds
+        """
         # Calculate bounding box for the route
         bounds = self._calculate_route_bounds(mission_plan.waypoints, buffer_meters)
-        logger.info(f"Route bounds: {bounds}")
         
         # Get tiles that cover the route
         tiles = list(mercantile.tiles(
@@ -218,36 +321,50 @@ class ExportService:
         if not tiles:
             raise ValueError("No tiles found for the given route bounds")
         
-        # Download tiles
-        tile_images = await self._download_tiles(tiles, map_type)
-        
-        # Stitch tiles together into a single image
-        stitched_image, image_bounds = self._stitch_tiles(tiles, tile_images)
-        
-        # Convert to GeoTIFF
-        geotiff_bytes = self._create_geotiff(stitched_image, image_bounds)
+        # The tiles always form a full rectangle, so its corners identify the stitched raster
+        key = (
+            zoom_level, _TILE_LAYERS.get(map_type, "s"),
+            min(tile.x for tile in tiles), min(tile.y for tile in tiles),
+            max(tile.x for tile in tiles), max(tile.y for tile in tiles),
+        )
+        cached = self._stitch_cache.get(key)
+        if cached is not None:
+            self._stitch_cache.move_to_end(key)
+            logger.info("Reusing stitched tiles from a previous export")
+            return cached
+        
+        # Download tiles and stitch them as they arrive
+        stitched, image_bounds, complete = await self._download_tiles(tiles, map_type)
+        # Shared between exports from here on; the encoders only read it
+        stitched.flags.writeable = False
+        
+        # Only keep rasters without placeholder tiles so a transient failure is retried next time
+        if complete and _STITCH_CACHE_SIZE > 0:
+            self._stitch_cache[key] = (stitched, image_bounds)
+            if len(self._stitch_cache) > _STITCH_CACHE_SIZE:
+                self._stitch_cache.popitem(last=False)
         
-        logger.info("GeoTIFF generation completed")
-        return geotiff_bytes
+        return stitched, image_bounds
 
     def _calculate_route_bounds(self, waypoints: List[Waypoint], buffer_meters: int) -> Dict[str, float]:
         """Calculate bounding box for waypoints with buffer."""
         if not waypoints:
             raise ValueError("No waypoints provided")
         
-        lats = [wp.position.lat for wp in waypoints]
-        lngs = [wp.position.lng for wp in waypoints]
+        coords = np.fromiter(
+            (c for wp in waypoints for c in (wp.position.lat, wp.position.lng)),
+            dtype=np.float64,
+            count=2 * len(waypoints),
+        ).reshape(-1, 2)
         
-        min_lat, max_lat = min(lats), max(lats)
-        min_lng, max_lng = min(lngs), max(lngs)
+        (min_lat, min_lng), (max_lat, max_lng) = coords.min(axis=0).tolist(), coords.max(axis=0).tolist()
         
         # Convert buffer from meters to degrees
-        # 1 degree latitude ≈ 111,320 meters (more accurate)
-        lat_buffer = buffer_meters / 111320
+        lat_buffer = buffer_meters * _DEG_PER_METER
         
         # Longitude varies by latitude - use center latitude for calculation
         center_lat = (min_lat + max_lat) / 2
-        lng_buffer = buffer_meters / (111320 * abs(np.cos(np.radians(center_lat))))
+        lng_buffer = lat_buffer / abs(np.cos(np.radians(center_lat)))
         
         # Add small extra buffer (10%) to ensure route is well-contained
         lat_buffer *= 1.1
@@ -263,53 +380,113 @@ class ExportService:
         logger.info(f"Route bounds: {bounds}")
         return bounds
 
-    async def _download_tiles(self, tiles: List[mercantile.Tile], map_type: str = "satellite") -> Dict[mercantile.Tile, Image.Image]:
-        """Download map tiles from Google Maps."""
-        tile_images = {}
-        
-        async with httpx.AsyncClient() as client:
-            # Download tiles in batches to avoid overwhelming the API
-            for i in range(0, len(tiles), 10):  # Process 10 tiles at a time
-                batch = tiles[i:i+10]
-                tasks = [self._download_single_tile(client, tile, map_type) for tile in batch]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for tile, result in zip(batch, results):
-                    if isinstance(result, Exception):
-                        logger.warning(f"Failed to download tile {tile}: {result}")
-                        # Create a placeholder image for failed tiles
-                        tile_images[tile] = Image.new('RGB', (256, 256), color='gray')
-                    else:
-                        tile_images[tile] = result
-        
-        return tile_images
-
-    async def _download_single_tile(self, client: httpx.AsyncClient, tile: mercantile.Tile, map_type: str) -> Image.Image:
-        """Download a single tile from Google Maps."""
-        # Google Maps tile layer types
-        layer_types = {
-            "satellite": "s",      # Satellite imagery
-            "roadmap": "m",        # Standard roadmap
-            "hybrid": "y",         # Hybrid (satellite + roads/labels)
-            "terrain": "t"         # Terrain
-        }
+    async def _download_tiles(self, tiles: List[mercantile.Tile], map_type: str = "satellite") -> Tuple[np.ndarray, Dict[str, float], bool]:
+        """
+        Download map tiles from Google Maps and stitch them into a single band-major (3, height, width) uint8 RGB array.
         
-        layer = layer_types.get(map_type, "s")  # Default to satellite
+        Each tile is decoded and copied into the canvas in a worker thread as soon as it arrives,
+        so stitching overlaps with the downloads still in flight.
         
-        # Google Maps tile servers (mt0-mt3)
-        server = f"mt{tile.x % 4}"  # Load balance across servers
+        Returns:
+            Tuple of the stitched array, its geographic bounds, and whether every tile downloaded
+        """
+        canvas, origin, image_bounds = self._allocate_canvas(tiles)
+        client = self._get_tile_client()
         
-        url = f"https://{server}.google.com/vt/lyrs={layer}&x={tile.x}&y={tile.y}&z={tile.z}&key={self.google_maps_api_key}"
+        # Resolve the layer and render everything but the tile coordinates into the URL once per export
+        layer = _TILE_LAYERS.get(map_type, "s")  # Default to satellite
+        url_template = (
+            f"https://mt{{server}}.google.com/vt/lyrs={layer}&x={{x}}&y={{y}}&z={{z}}&key={self.google_maps_api_key}"
+        )
+        
+        # Keep a bounded number of requests in flight instead of waiting on fixed batches
+        semaphore = asyncio.Semaphore(_TILE_CONCURRENCY)
+        
+        async def download(tile: mercantile.Tile):
+            async with semaphore:
+                image = await self._download_single_tile(client, tile, layer, url_template)
+            await asyncio.to_thread(self._place_tile, canvas, origin, tile, image)
         
-        response = await client.get(url, timeout=30.0)
-        response.raise_for_status()
+        results = await asyncio.gather(*(download(tile) for tile in tiles), return_exceptions=True)
         
-        # Convert to PIL Image
-        image = Image.open(BytesIO(response.content))
+        complete = True
+        for tile, result in zip(tiles, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to download tile {tile}: {result}")
+                # Fill a placeholder for failed tiles
+                self._place_tile(canvas, origin, tile, None)
+                complete = False
+        
+        return canvas, image_bounds, complete
+
+    async def _download_single_tile(self, client: httpx.AsyncClient, tile: mercantile.Tile, layer: str, url_template: str) -> Image.Image:
+        """Download a single tile from Google Maps using the export's pre-rendered URL template."""
+        # Google Maps tile servers (mt0-mt3); load balance across servers
+        url = url_template.format(server=tile.x & 3, x=tile.x, y=tile.y, z=tile.z)
+        
+        key = (tile.z, tile.x, tile.y, layer)
+        content = self._tile_cache.get(key)
+        if content is not None:
+            self._tile_cache.move_to_end(key)
+            return self._decode_tile(content)
+        
+        image = None
+        path = self._tile_cache_dir / f"{layer}_{tile.z}_{tile.x}_{tile.y}" if self._tile_cache_dir else None
+        if path is not None:
+            content = await asyncio.to_thread(self._read_cached_tile, path)
+            if content is not None:
+                try:
+                    image = self._decode_tile(content)
+                except Exception as e:
+                    # A damaged file is replaced by the download below
+                    logger.warning(f"Discarding unreadable cached tile {path}: {e}")
+        
+        if image is None:
+            # The shared client's 30s timeout applies
+            response = await client.get(url)
+            response.raise_for_status()
+            content = response.content
+            # Decoding first keeps error pages served with a 200 out of both caches
+            image = self._decode_tile(content)
+            if path is not None:
+                await asyncio.to_thread(self._write_cached_tile, path, content)
+        
+        # Remember the encoded tile; evict the least recently used once full
+        self._tile_cache[key] = content
+        if len(self._tile_cache) > _TILE_CACHE_SIZE:
+            self._tile_cache.popitem(last=False)
+        return image
+
+    @staticmethod
+    def _decode_tile(content: bytes) -> Image.Image:
+        """Decode tile bytes into a PIL image, raising if they are not a readable image."""
+        image = Image.open(BytesIO(content))
+        image.load()
         return image
 
-    def _stitch_tiles(self, tiles: List[mercantile.Tile], tile_images: Dict[mercantile.Tile, Image.Image]) -> Tuple[Image.Image, Dict[str, float]]:
-        """Stitch individual tiles into a single image."""
+    def _read_cached_tile(self, path: Path) -> Optional[bytes]:
+        """Return tile bytes from the disk cache, or None if the tile is not cached."""
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to read cached tile {path}: {e}")
+            return None
+
+    def _write_cached_tile(self, path: Path, content: bytes):
+        """Store tile bytes in the disk cache; failures only cost a future re-download."""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a private file and rename so concurrent workers and threads never read a partial tile
+            tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache tile {path}: {e}")
+
+    def _allocate_canvas(self, tiles: List[mercantile.Tile]) -> Tuple[np.ndarray, Tuple[int, int], Dict[str, float]]:
+        """Allocate the stitched canvas for tiles; returns it with the top-left tile's (x, y) and its geographic bounds."""
         if not tiles:
             raise ValueError("No tiles to stitch")
         
@@ -320,19 +497,12 @@ class ExportService:
         max_y = max(tile.y for tile in tiles)
         
         # Calculate output image size (Google Maps tiles are 256x256)
-        tile_size = 256
-        width = (max_x - min_x + 1) * tile_size
-        height = (max_y - min_y + 1) * tile_size
-        
-        # Create output image
-        stitched = Image.new('RGB', (width, height))
+        width = (max_x - min_x + 1) * _TILE_SIZE
+        height = (max_y - min_y + 1) * _TILE_SIZE
         
-        # Place each tile in the correct position
-        for tile in tiles:
-            if tile in tile_images:
-                x_offset = (tile.x - min_x) * tile_size
-                y_offset = (tile.y - min_y) * tile_size
-                stitched.paste(tile_images[tile], (x_offset, y_offset))
+        # Create output canvas (black where a tile is missing). Band-major, the layout rasterio writes,
+        # so the GeoTIFF encode needs no transposed copy of the whole raster
+        canvas = np.zeros((3, height, width), dtype=np.uint8)
         
         # Calculate geographic bounds of the stitched image
         top_left_tile = mercantile.Tile(min_x, min_y, tiles[0].z)
@@ -348,23 +518,27 @@ class ExportService:
             'south': bottom_right_bounds.south
         }
         
-        return stitched, image_bounds
+        return canvas, (min_x, min_y), image_bounds
 
-    def _create_geotiff(self, image: Image.Image, bounds: Dict[str, float]) -> bytes:
-        """Convert PIL Image to georeferenced GeoTIFF with proper spatial reference."""
-        with tempfile.NamedTemporaryFile(suffix='.geotiff', delete=False) as temp_file:
-            temp_path = temp_file.name
-        
-        # Convert PIL image to numpy array
-        image_array = np.array(image)
-        
-        # Handle RGB vs RGBA
-        if len(image_array.shape) == 3:
-            height, width, bands = image_array.shape
-        else:
-            height, width = image_array.shape
-            bands = 1
-            image_array = image_array.reshape((height, width, 1))
+    def _place_tile(self, canvas: np.ndarray, origin: Tuple[int, int], tile: mercantile.Tile, image: Optional[Image.Image]):
+        """Copy a tile's pixels into its slot of the canvas, or gray if the tile is unavailable (blocking)."""
+        x_offset = (tile.x - origin[0]) * _TILE_SIZE
+        y_offset = (tile.y - origin[1]) * _TILE_SIZE
+        slot = canvas[:, y_offset:y_offset + _TILE_SIZE, x_offset:x_offset + _TILE_SIZE]
+        if image is None:
+            slot[...] = 128
+            return
+        if image.format == 'JPEG':
+            # Let libjpeg decode straight to RGB at native size instead of converting afterwards
+            image.draft('RGB', (_TILE_SIZE, _TILE_SIZE))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        slot[...] = np.asarray(image).transpose(2, 0, 1)
+
+    def _create_geotiff(self, image_array: np.ndarray, bounds: Dict[str, float], compression: GeoTiffCompression = "deflate") -> bytes:
+        """Convert a stitched (bands, height, width) RGB array to georeferenced GeoTIFF with proper spatial reference."""
+        # The canvas is already band-major and contiguous, so it is written as-is in one call
+        bands, height, width = image_array.shape
         
         # Create geotransform (maps pixel coordinates to geographic coordinates)
         transform = from_bounds(
@@ -377,98 +551,103 @@ class ExportService:
         logger.info(f"Geographic bounds: W={bounds['west']:.6f}, S={bounds['south']:.6f}, E={bounds['east']:.6f}, N={bounds['north']:.6f}")
         logger.info(f"Pixel size: {abs(transform.a):.8f}° x {abs(transform.e):.8f}°")
         
-        # Write georeferenced GeoTIFF
-        with rasterio.open(
-            temp_path,
-            'w',
-            driver='GTiff',
-            height=height,
-            width=width,
-            count=bands,
-            dtype=image_array.dtype,
-            crs=CRS.from_epsg(4326),  # WGS84 Geographic Coordinate System
-            transform=transform,
-            compress='jpeg',
-            tiled=True,
-            # Add georeferencing metadata
-            photometric='RGB' if bands == 3 else 'GRAY',
-            interleave='pixel'
-        ) as dst:
-            # Write image data
-            if bands == 1:
-                dst.write(image_array[:, :, 0], 1)
-            else:
-                for i in range(bands):
-                    dst.write(image_array[:, :, i], i + 1)
+        # Write georeferenced GeoTIFF straight into an in-memory GDAL file (no temp file round-trip)
+        with MemoryFile() as memfile:
+            with memfile.open(
+                driver='GTiff',
+                height=height,
+                width=width,
+                count=bands,
+                dtype=image_array.dtype,
+                crs=CRS.from_epsg(4326),  # WGS84 Geographic Coordinate System
+                transform=transform,
+                tiled=True,
+                blockxsize=512,
+                blockysize=512,
+                num_threads='ALL_CPUS',
+                **_GEOTIFF_COMPRESSION_OPTIONS[compression],
+                # Add georeferencing metadata
+                photometric='RGB',
+                interleave='pixel'
+            ) as dst:
+                # Write all bands at once
+                dst.write(image_array)
             
-            # Add additional metadata for better georeferencing
-            dst.update_tags(
-                TIFFTAG_SOFTWARE="Mission Simulator - Drone Route Export",
-                TIFFTAG_ARTIST="Mission Planning API",
-                TIFFTAG_DOCUMENTNAME=f"Drone Route GeoTIFF",
-                AREA_OR_POINT="Area",  # Pixel values represent area averages
-                DATUM="WGS84",
-                PROJECTION="Geographic"
-            )
+                # Add additional metadata for better georeferencing
+                dst.update_tags(
+                    TIFFTAG_SOFTWARE="Mission Simulator - Drone Route Export",
+                    TIFFTAG_ARTIST="Mission Planning API",
+                    TIFFTAG_DOCUMENTNAME=f"Drone Route GeoTIFF",
+                    AREA_OR_POINT="Area",  # Pixel values represent area averages
+                    DATUM="WGS84",
+                    PROJECTION="Geographic"
+                )
             
-            # Verify georeferencing
-            logger.info(f"GeoTIFF CRS: {dst.crs}")
-            logger.info(f"GeoTIFF Transform: {dst.transform}")
-            logger.info(f"GeoTIFF Bounds: {dst.bounds}")
+                # Verify georeferencing
+                logger.info(f"GeoTIFF CRS: {dst.crs}")
+                logger.info(f"GeoTIFF Transform: {dst.transform}")
+                logger.info(f"GeoTIFF Bounds: {dst.bounds}")
         
-        # Read the georeferenced file back as bytes
-        with open(temp_path, 'rb') as f:
-            geotiff_bytes = f.read()
-        
-        # Clean up temporary file
-        os.unlink(temp_path)
+            geotiff_bytes = memfile.read()
         
         logger.info("Georeferenced GeoTIFF creation completed")
         return geotiff_bytes
 
-    def verify_geotiff_georeferencing(self, geotiff_path: str) -> Dict[str, Any]:
+    def verify_geotiff_georeferencing(self, geotiff: Union[str, bytes]) -> Dict[str, Any]:
         """
         Verify the georeferencing of a GeoTIFF file.
         This is a utility method for debugging and validation.
+        
+        Args:
+            geotiff: Path to a GeoTIFF file, or the GeoTIFF bytes (read in memory, no temp file)
         """
+        if isinstance(geotiff, (bytes, bytearray)):
+            with MemoryFile(geotiff) as memfile:
+                with memfile.open() as src:
+                    return self._describe_georeferencing(src)
+        
+        with rasterio.open(geotiff) as src:
+            return self._describe_georeferencing(src)
+
+    def _describe_georeferencing(self, src) -> Dict[str, Any]:
+        """Collect CRS, transform, bounds and corner information from an open rasterio dataset."""
         verification_info = {}
         
-        with rasterio.open(geotiff_path) as src:
-            verification_info.update({
-                "crs": str(src.crs),
-                "crs_epsg": src.crs.to_epsg() if src.crs else None,
-                "transform": list(src.transform),
-                "bounds": {
-                    "left": src.bounds.left,
-                    "bottom": src.bounds.bottom, 
-                    "right": src.bounds.right,
-                    "top": src.bounds.top
-                },
-                "width": src.width,
-                "height": src.height,
-                "count": src.count,
-                "dtype": str(src.dtypes[0]),
-                "nodata": src.nodata,
-                "is_georeferenced": src.crs is not None and src.transform != rasterio.Affine.identity(),
-                "pixel_size": {
-                    "x": abs(src.transform.a),
-                    "y": abs(src.transform.e)
-                },
-                "tags": dict(src.tags())
-            })
-            
-            # Calculate center point
-            center_x = (src.bounds.left + src.bounds.right) / 2
-            center_y = (src.bounds.bottom + src.bounds.top) / 2
-            verification_info["center_point"] = {"x": center_x, "y": center_y}
-            
-            # Get corner coordinates in geographic space
-            verification_info["corners"] = {
-                "top_left": src.transform * (0, 0),
-                "top_right": src.transform * (src.width, 0),
-                "bottom_left": src.transform * (0, src.height),
-                "bottom_right": src.transform * (src.width, src.height)
-            }
+        verification_info.update({
+            "crs": str(src.crs),
+            "crs_epsg": src.crs.to_epsg() if src.crs else None,
+            "transform": list(src.transform),
+            "bounds": {
+                "left": src.bounds.left,
+                "bottom": src.bounds.bottom, 
+                "right": src.bounds.right,
+                "top": src.bounds.top
+            },
+            "width": src.width,
+            "height": src.height,
+            "count": src.count,
+            "dtype": str(src.dtypes[0]),
+            "nodata": src.nodata,
+            "is_georeferenced": src.crs is not None and src.transform != rasterio.Affine.identity(),
+            "pixel_size": {
+                "x": abs(src.transform.a),
+                "y": abs(src.transform.e)
+            },
+            "tags": dict(src.tags())
+        })
+
+        # Calculate center point
+        center_x = (src.bounds.left + src.bounds.right) / 2
+        center_y = (src.bounds.bottom + src.bounds.top) / 2
+        verification_info["center_point"] = {"x": center_x, "y": center_y}
+
+        # Get corner coordinates in geographic space
+        verification_info["corners"] = {
+            "top_left": src.transform * (0, 0),
+            "top_right": src.transform * (src.width, 0),
+            "bottom_left": src.transform * (0, src.height),
+            "bottom_right": src.transform * (src.width, src.height)
+        }
         
         return verification_info
 
@@ -496,46 +675,28 @@ class ExportService:
         
         logger.info(f"Generating PNG for mission {mission_plan.id} at zoom {zoom_level}")
         
-        # Calculate bounding box for the route
-        bounds = self._calculate_route_bounds(mission_plan.waypoints, buffer_meters)
-        logger.info(f"Route bounds: {bounds}")
-        
-        # Get tiles that cover the route
-        tiles = list(mercantile.tiles(
-            bounds['west'], bounds['south'], 
-            bounds['east'], bounds['north'], 
-            zoom_level
-        ))
-        logger.info(f"Need {len(tiles)} tiles at zoom {zoom_level}")
-        
-        if not tiles:
-            raise ValueError("No tiles found for the given route bounds")
-        
-        # Download tiles
-        tile_images = await self._download_tiles(tiles, map_type)
-        
-        # Stitch tiles together into a single image
-        stitched_image, image_bounds = self._stitch_tiles(tiles, tile_images)
+        stitched, _ = await self._build_stitched(mission_plan, zoom_level, buffer_meters, map_type)
         
-        # Convert to PNG bytes
-        png_bytes = self._create_png(stitched_image)
+        # Encode the PNG in a worker thread; it is CPU-bound and would block the event loop
+        png_bytes = await asyncio.to_thread(self._create_png, stitched)
         
         logger.info("PNG generation completed")
         return png_bytes
 
-    def _create_png(self, image: Image.Image) -> bytes:
-        """Convert PIL Image to PNG bytes."""
+    def _create_png(self, image_array: np.ndarray) -> bytes:
+        """Convert a stitched (bands, height, width) RGB array to PNG bytes."""
+        image = Image.fromarray(np.ascontiguousarray(image_array.transpose(1, 2, 0)))
         logger.info(f"Creating PNG: {image.width}x{image.height} pixels")
         
         # Create a BytesIO buffer to hold the PNG data
         png_buffer = BytesIO()
         
-        # Save as PNG with optimization
+        # Save as PNG with fast zlib compression; satellite imagery barely shrinks at higher levels,
+        # and optimize=True would force level 9
         image.save(
             png_buffer, 
             format='PNG',
-            optimize=True,
-            compress_level=6  # Good balance of size vs quality
+            compress_level=1
         )
         
         # Get the PNG bytes
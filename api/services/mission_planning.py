@@ -1,22 +1,225 @@
 import json
+import re
 import uuid
-import math
+from math import sin, cos, sqrt, asin, radians, hypot, pi
 import os
 import asyncio
-from typing import List, Dict, Any, Optional, AsyncGenerator
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional, Union, AsyncGenerator, AsyncIterator, Callable
 from datetime import datetime
 import logging
-from functools import wraps
+from functools import wraps, lru_cache
+from collections import OrderedDict
+
+import httpx
+import numpy as np
+import orjson
+from pydantic import TypeAdapter
+
+# Compile the scalar Haversine kernel when Numba is installed; it is optional
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 from models import (
     MissionPlanRequest, MissionPlan, Waypoint, WaypointType,
-    Coordinate, StreamingChunk, MissionPlanResponse
+    Coordinate, StreamingChunk, ChunkType, MissionPlanResponse,
+    DroneCapabilities, EnvironmentConditions, _coordinates_to_array
 )
-from llm import stream_text
+from llm import stream_text, default_model
 from debug_utils import debug_print
 
 logger = logging.getLogger(__name__)
 
+# Concurrent Geocoding API requests per mission
+_GEOCODE_CONCURRENCY = 8
+
+# Geocoded locations kept in memory across missions
+_GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE") or 10000)
+
+# SQLite file shared by every worker on the host, so lookups survive restarts. Opt-in: its results
+# become waypoint coordinates, so it belongs at a path the deployment controls, not a shared temp dir
+_GEOCODE_CACHE_DB = os.getenv("GEOCODE_CACHE_DB", "")
+# How long stored results stay valid; misses expire sooner since new places do get indexed
+_GEOCODE_HIT_TTL = 30 * 24 * 3600
+_GEOCODE_MISS_TTL = 3600
+
+# Chunks below are built with StreamingChunk.model_construct: every field comes from this module,
+# so re-validating (and recursively walking every data payload) on each yield is pure overhead
+
+# data payloads of the fixed-progress status chunks, built once and shared by every stream;
+# the SSE route only serializes chunk data, so nothing mutates them
+_PHASE_STARTED = {
+    1: {"phase": 1, "total_phases": 3, "progress": 5},
+    2: {"phase": 2, "total_phases": 3, "progress": 30},
+    3: {"phase": 3, "total_phases": 3, "progress": 60},
+}
+_GEOCODING_DONE = {"phase": 2, "total_phases": 3, "progress": 55}
+_HEARTBEAT_DATA = {"phase": 3, "total_phases": 3}
+
+# Built once; re-validates the plan dict carried by the final streaming chunk
+_plan_adapter = TypeAdapter(MissionPlan)
+
+
+def _parse_llm_json(text: str) -> Dict[str, Any]:
+    """Parse the JSON object in an LLM response, ignoring any prose or code fences around it"""
+    start = text.find('{')
+    end = text.rfind('}') + 1
+    if start == -1 or end <= start:
+        # A JSONDecodeError, like a malformed object, so retry_llm_call gives it the full JSON retry budget
+        raise json.JSONDecodeError("No JSON found in response", text, 0)
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the retry decorator still catches it
+    return orjson.loads(text[start:end])
+
+
+# Characters that matter when scanning JSON structure; everything else is skipped in C
+_JSON_STRUCTURE = re.compile(r'[{}\[\]"\\]')
+
+
+# Seconds without LLM output before phase 3 emits a "still working" status chunk
+_HEARTBEAT_SECONDS = 5.0
+_STREAM_END = object()
+
+
+async def _buffered(source: AsyncIterator[Any], maxsize: int = 64) -> AsyncIterator[Optional[Any]]:
+    """
+    Read an async iterator ahead into a bounded queue from a background task.
+    
+    Yields the source's items in order, and None whenever nothing arrived for _HEARTBEAT_SECONDS,
+    so the caller can keep its client informed while the upstream stalls. Source errors are re-raised.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    error: Optional[Exception] = None
+    
+    async def produce():
+        nonlocal error
+        try:
+            async for item in source:
+                await queue.put(item)
+        except Exception as e:
+            error = e
+        await queue.put(_STREAM_END)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), _HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if item is _STREAM_END:
+                break
+            yield item
+        if error is not None:
+            raise error
+    finally:
+        producer.cancel()
+
+
+class _JsonArrayScanner:
+    """
+    Incrementally pull complete objects out of one JSON array in a streamed LLM response.
+    
+    feed() takes each new piece of text and returns the source of every top-level object of the
+    array under `key` that the piece completed. Only the object currently being streamed is buffered.
+    """
+    
+    # Text kept while looking for the key, so a key split across pieces is still found
+    _KEY_WINDOW = 64
+    
+    def __init__(self, key: str):
+        self._key = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+        self._buffer = ""
+        self._found = False
+        self._done = False
+        self._depth = 0      # brace depth inside the array
+        self._in_string = False
+        self._pos = 0        # next buffer index to scan
+        self._start = 0      # buffer index where the current object starts
+    
+    def feed(self, piece: str) -> List[str]:
+        objects = []
+        if self._done:
+            return objects
+        buffer = self._buffer + piece
+        if not self._found:
+            match = self._key.search(buffer)
+            if match is None:
+                self._buffer = buffer[-self._KEY_WINDOW:]
+                return objects
+            self._found = True
+            buffer = buffer[match.end():]
+            self._pos = 0
+        
+        for match in _JSON_STRUCTURE.finditer(buffer, self._pos):
+            i = match.start()
+            if i < self._pos:
+                # The character after a backslash
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == '\\':
+                    self._pos = i + 2
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    objects.append(buffer[self._start:i + 1])
+            elif char == ']' and self._depth == 0:
+                self._done = True
+                self._buffer = ""
+                return objects
+        
+        # Keep only the unfinished object; a trailing backslash escapes a character that has not arrived yet
+        keep_from = self._start if self._depth else len(buffer)
+        self._pos = max(len(buffer), self._pos) - keep_from
+        self._start = 0
+        self._buffer = buffer[keep_from:]
+        return objects
+
+
+# Waypoint type values accepted from the LLM, for checking streamed waypoints without building models
+_WAYPOINT_TYPES = frozenset(t.value for t in WaypointType)
+
+
+def _location_coordinates(location: Dict[str, Any]) -> Optional[tuple[float, float]]:
+    """Coordinates given directly on a key location by the structure analysis, if valid"""
+    coords = location.get('coordinates')
+    if not isinstance(coords, dict):
+        return None
+    lat, lng = coords.get('lat'), coords.get('lng')
+    if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return (float(lat), float(lng))
+
+
+def _waypoint_from_data(wp_data: Dict[str, Any]) -> Waypoint:
+    """Build a Waypoint from one entry of the LLM's waypoints array"""
+    return Waypoint(
+        id=wp_data.get('id', str(uuid.uuid4())),
+        type=WaypointType(wp_data['type']),
+        position=Coordinate(**wp_data['position']),
+        order=wp_data['order'],
+        name=wp_data.get('name'),
+        speed=wp_data.get('speed'),
+        loiter_time=wp_data.get('loiter_time'),
+        radius=wp_data.get('radius'),
+        camera_action=wp_data.get('camera_action')
+    )
+
 
 def retry_llm_call(max_retries=5, base_delay=1.0, max_delay=30.0, backoff_factor=2.0):
     """
@@ -28,11 +231,18 @@ def retry_llm_call(max_retries=5, base_delay=1.0, max_delay=30.0, backoff_factor
         max_delay: Maximum delay between retries in seconds
         backoff_factor: Multiplier for delay after each retry
     """
+    # The backoff schedule is fixed per decorated function: a retry after attempt i waits delays[i]
+    delays = tuple(min(base_delay * backoff_factor ** i, max_delay) for i in range(max_retries))
+    # For non-JSON errors, we might want to retry fewer times or not at all
+    # depending on the error type; only retry critical errors 2 times max
+    error_retries = min(2, max_retries)
+    
     def decorator(func):
+        name = func.__name__
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
             last_exception = None
-            delay = base_delay
             
             for attempt in range(max_retries + 1):  # +1 for initial attempt
                 try:
@@ -40,21 +250,18 @@ def retry_llm_call(max_retries=5, base_delay=1.0, max_delay=30.0, backoff_factor
                 except json.JSONDecodeError as e:
                     last_exception = e
                     if attempt < max_retries:
-                        logger.warning(f"JSON decode error in {func.__name__} (attempt {attempt + 1}/{max_retries + 1}): {e}. Retrying in {delay:.1f}s...")
-                        await asyncio.sleep(delay)
-                        delay = min(delay * backoff_factor, max_delay)
+                        logger.warning("JSON decode error in %s (attempt %d/%d): %s. Retrying in %.1fs...",
+                                       name, attempt + 1, max_retries + 1, e, delays[attempt])
+                        await asyncio.sleep(delays[attempt])
                     else:
-                        logger.error(f"JSON decode error in {func.__name__} failed after {max_retries + 1} attempts: {e}")
+                        logger.error("JSON decode error in %s failed after %d attempts: %s", name, max_retries + 1, e)
                 except Exception as e:
-                    # For non-JSON errors, we might want to retry fewer times or not at all
-                    # depending on the error type
-                    if attempt < min(2, max_retries):  # Only retry critical errors 2 times max
-                        logger.warning(f"Error in {func.__name__} (attempt {attempt + 1}): {e}. Retrying in {delay:.1f}s...")
+                    if attempt < error_retries:
+                        logger.warning("Error in %s (attempt %d): %s. Retrying in %.1fs...", name, attempt + 1, e, delays[attempt])
                         last_exception = e
-                        await asyncio.sleep(delay)
-                        delay = min(delay * backoff_factor, max_delay)
+                        await asyncio.sleep(delays[attempt])
                     else:
-                        logger.error(f"Error in {func.__name__} failed after retries: {e}")
+                        logger.error("Error in %s failed after retries: %s", name, e)
                         raise e
             
             # If we get here, all retries failed
@@ -63,61 +270,8 @@ def retry_llm_call(max_retries=5, base_delay=1.0, max_delay=30.0, backoff_factor
     return decorator
 
 
-class GeoCodingService:
-    """Simple geocoding service using Google Maps API"""
-    
-    def __init__(self):
-        self.api_key = os.getenv('GOOGLE_MAPS_API_KEY')
-        if not self.api_key:
-            logger.warning("GOOGLE_MAPS_API_KEY not found in environment variables")
-    
-    async def geocode_location(self, location_name: str) -> Optional[tuple[float, float]]:
-        """Geocode a location name to lat/lng coordinates"""
-        if not self.api_key:
-            logger.warning(f"Cannot geocode '{location_name}': No Google Maps API key")
-            return None
-            
-        # For now, using a simple implementation
-        # You can enhance this with actual Google Maps API calls
-        try:
-            import aiohttp
-            
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
-            params = {
-                'address': location_name,
-                'key': self.api_key
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data['status'] == 'OK' and data['results']:
-                            location = data['results'][0]['geometry']['location']
-                            return (location['lat'], location['lng'])
-                        else:
-                            logger.warning(f"Geocoding failed for '{location_name}': {data.get('status', 'Unknown error')}")
-                            return None
-                    else:
-                        logger.error(f"Geocoding API request failed with status {response.status}")
-                        return None
-                        
-        except ImportError:
-            logger.warning("aiohttp not available, using fallback coordinates")
-            # Fallback coordinates (San Francisco area)
-            return (37.7749, -122.4194)
-        except Exception as e:
-            logger.error(f"Error geocoding '{location_name}': {e}")
-            return None
-
-
-class MissionPlanningService:
-    """Service for generating mission plans using multiple LLM calls and geocoding"""
-    
-    def __init__(self):
-        self.geocoding_service = GeoCodingService()
-        
-        self.structure_system_prompt = """You are an expert drone mission planner analyzing mission requirements.
+# System prompts are static; built once rather than per service instance
+_STRUCTURE_SYSTEM_PROMPT = """You are an expert drone mission planner analyzing mission requirements.
 
 Your job is to analyze a mission request and identify:
 1. Key locations mentioned or implied in the mission
@@ -126,6 +280,7 @@ Your job is to analyze a mission request and identify:
 4. Potential challenges or considerations
 
 Be specific about locations - include full addresses or landmarks when possible for accurate geocoding.
+Only include "coordinates" for a location when the request states its exact latitude and longitude; omit the field otherwise.
 
 Respond with ONLY valid JSON in this exact format:
 {
@@ -134,7 +289,8 @@ Respond with ONLY valid JSON in this exact format:
     {
       "name": "Specific location name or address",
       "purpose": "takeoff|landing|survey_area|inspection_point|waypoint|loiter_zone",
-      "priority": "high|medium|low"
+      "priority": "high|medium|low",
+      "coordinates": {"lat": 0.0, "lng": 0.0}
     }
   ],
   "waypoint_sequence": [
@@ -150,7 +306,7 @@ Respond with ONLY valid JSON in this exact format:
   ]
 }"""
 
-        self.detailed_system_prompt = """You are an expert drone mission planner creating detailed flight plans.
+_DETAILED_SYSTEM_PROMPT = """You are an expert drone mission planner creating detailed flight plans.
 
 You will be given:
 1. Mission structure analysis
@@ -189,6 +345,352 @@ Optional waypoint fields: "speed", "loiter_time", "radius", "camera_action"
 
 RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
 
+# Expected JSON schema for the phase-3 structured output
+_DETAILED_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "mission_name": {"type": "string"},
+        "mission_description": {"type": "string"},
+        "waypoints": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "type": {"type": "string", "enum": ["takeoff", "waypoint", "loiter", "survey", "orbit", "land"]},
+                    "position": {
+                        "type": "object",
+                        "properties": {
+                            "lat": {"type": "number"},
+                            "lng": {"type": "number"},
+                            "alt": {"type": "number"}
+                        },
+                        "required": ["lat", "lng", "alt"]
+                    },
+                    "order": {"type": "integer"},
+                    "name": {"type": "string"},
+                    "speed": {"type": "number"},
+                    "loiter_time": {"type": "number"},
+                    "radius": {"type": "number"},
+                    "camera_action": {"type": "string"}
+                },
+                "required": ["id", "type", "position", "order"]
+            }
+        },
+        "estimated_duration": {"type": "number"},
+        "total_distance": {"type": "number"},
+        "warnings": {
+            "type": "array",
+            "items": {"type": "string"}
+        }
+    },
+    "required": ["mission_name", "mission_description", "waypoints", "estimated_duration", "total_distance"]
+}
+
+# Top-level fields the plan must carry; the waypoints themselves are validated by the Pydantic models
+_DETAILED_PLAN_REQUIRED = tuple(_DETAILED_PLAN_SCHEMA["required"])
+
+_DETAILED_PROMPT_HEADER = "Create a detailed drone mission plan based on the following analysis and coordinates:"
+
+_DETAILED_PROMPT_CLOSING = (
+    "\nUse the precise coordinates provided above to create an optimized mission plan.\n"
+    "Ensure waypoints follow logical sequence and maintain safety margins.\n"
+    "Calculate realistic timing and distances based on drone capabilities."
+)
+
+
+def _drone_capabilities_block(cap: DroneCapabilities) -> str:
+    """Drone capabilities section shared by the structure and detailed prompts"""
+    block = (
+        "\n**Drone Capabilities**:\n"
+        f"  - Max Altitude: {cap.max_altitude}m\n"
+        f"  - Max Speed: {cap.max_speed}m/s\n"
+        f"  - Flight Time: {cap.flight_time} minutes\n"
+        f"  - Camera: {'Yes' if cap.has_camera else 'No'}\n"
+        f"  - Gimbal: {'Yes' if cap.has_gimbal else 'No'}"
+    )
+    if cap.payload_capacity:
+        block += f"\n  - Payload Capacity: {cap.payload_capacity}kg"
+    return block
+
+
+def _environment_block(env: EnvironmentConditions) -> str:
+    """Environmental conditions section shared by the structure and detailed prompts; unset values are left out"""
+    lines = (
+        f"  - Wind Speed: {env.wind_speed}m/s" if env.wind_speed is not None else None,
+        f"  - Wind Direction: {env.wind_direction}°" if env.wind_direction is not None else None,
+        f"  - Temperature: {env.temperature}°C" if env.temperature is not None else None,
+        f"  - Visibility: {env.visibility}m" if env.visibility is not None else None,
+        f"  - No-Fly Zones: {len(env.no_fly_zones)} defined" if env.no_fly_zones else None,
+    )
+    return "\n".join(("\n**Environmental Conditions**:", *filter(None, lines)))
+
+
+def _normalize_location_name(name: str) -> str:
+    """Cache and dedup key for a location name: case-folded with whitespace collapsed"""
+    return " ".join(name.split()).lower()
+
+
+class _GeocodeStore:
+    """Persistent geocode results in SQLite. Methods block; call them via asyncio.to_thread."""
+    
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        # One connection shared by the worker's threads; WAL lets other workers read while one writes
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocodes "
+                "(key TEXT PRIMARY KEY, lat REAL, lng REAL, status TEXT, fetched_at INTEGER)"
+            )
+    
+    def get(self, key: str) -> Optional[tuple[str, Optional[tuple[float, float]]]]:
+        """Return (status, coords) for an unexpired entry, or None if there is none"""
+        now = int(time.time())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lng, status FROM geocodes WHERE key = ? "
+                "AND fetched_at > CASE status WHEN 'OK' THEN ? ELSE ? END",
+                (key, now - _GEOCODE_HIT_TTL, now - _GEOCODE_MISS_TTL)
+            ).fetchone()
+        if row is None:
+            return None
+        lat, lng, status = row
+        return status, ((lat, lng) if status == 'OK' else None)
+    
+    def put(self, key: str, status: str, coords: Optional[tuple[float, float]]):
+        lat, lng = coords if coords is not None else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocodes (key, lat, lng, status, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lng, status, int(time.time()))
+            )
+    
+    def recent_hits(self, limit: int) -> List[tuple[str, float, float]]:
+        """Most recently fetched unexpired hits, newest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, lat, lng FROM geocodes WHERE status = 'OK' AND fetched_at > ? "
+                "ORDER BY fetched_at DESC LIMIT ?",
+                (int(time.time()) - _GEOCODE_HIT_TTL, limit)
+            ).fetchall()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GeoCodingService:
+    """Simple geocoding service using Google Maps API"""
+    
+    def __init__(self):
+        self.api_key = os.getenv('GOOGLE_MAPS_API_KEY')
+        if not self.api_key:
+            logger.warning("GOOGLE_MAPS_API_KEY not found in environment variables")
+        # Successful lookups keyed by normalized name, most recently used last
+        self._cache: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        # Names with no results, mapped to when to ask again, so repeats skip the store and the API
+        self._misses: "OrderedDict[str, float]" = OrderedDict()
+        # Lookups in progress, so concurrent requests for the same name share one API call
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Shared HTTP/2 client, created on first use; concurrent lookups are multiplexed over one connection
+        self._client: Optional[httpx.AsyncClient] = None
+        # Persistent cache behind the in-memory one, opened on first lookup
+        self._store: Optional[_GeocodeStore] = None
+        self._store_ready = False
+        self._store_lock = asyncio.Lock()
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared Geocoding API client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=16, keepalive_expiry=60.0)
+            )
+        return self._client
+    
+    async def _get_store(self) -> Optional[_GeocodeStore]:
+        """Open the persistent cache on first use and warm the in-memory cache from it"""
+        if self._store_ready:
+            return self._store
+        async with self._store_lock:
+            if self._store_ready:
+                return self._store
+            self._store_ready = True
+            if _GEOCODE_CACHE_DB:
+                try:
+                    self._store = await asyncio.to_thread(_GeocodeStore, _GEOCODE_CACHE_DB)
+                    rows = await asyncio.to_thread(self._store.recent_hits, _GEOCODE_CACHE_SIZE)
+                except sqlite3.Error as e:
+                    logger.warning(f"Geocode cache database unavailable, using memory only: {e}")
+                    self._store = None
+                else:
+                    # Oldest first, so the newest entries end up most recently used
+                    for key, lat, lng in reversed(rows):
+                        self._cache[key] = (lat, lng)
+        return self._store
+    
+    async def close(self):
+        """Close the shared HTTP client and cache database. Call once on application shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+            self._store_ready = False
+    
+    def cached_location(self, location_name: str) -> Optional[tuple[float, float]]:
+        """Coordinates already held in memory for a name, or None; never waits on I/O"""
+        key = _normalize_location_name(location_name)
+        coords = self._cache.get(key)
+        if coords is not None:
+            self._cache.move_to_end(key)
+        return coords
+    
+    async def geocode_location(self, location_name: str) -> Optional[tuple[float, float]]:
+        """Geocode a location name to lat/lng coordinates, reusing cached and in-flight lookups"""
+        if not self.api_key:
+            logger.warning(f"Cannot geocode '{location_name}': No Google Maps API key")
+            return None
+        
+        key = _normalize_location_name(location_name)
+        coords = self._cache.get(key)
+        if coords is not None:
+            self._cache.move_to_end(key)
+            return coords
+        
+        retry_at = self._misses.get(key)
+        if retry_at is not None:
+            if time.monotonic() < retry_at:
+                return None
+            del self._misses[key]
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await inflight
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            status, coords = await self._lookup(key, location_name)
+        except BaseException:
+            # Other requests sharing this lookup see a failed geocode, not this caller's cancellation
+            future.set_result(None)
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(coords)
+        
+        if coords is not None:
+            self._cache[key] = coords
+            if len(self._cache) > _GEOCODE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        elif status == 'ZERO_RESULTS':
+            # A miss read from the store may already be part-way through its TTL, so this can
+            # hold it up to one _GEOCODE_MISS_TTL longer; errors are transient and not kept
+            self._misses[key] = time.monotonic() + _GEOCODE_MISS_TTL
+            if len(self._misses) > _GEOCODE_CACHE_SIZE:
+                self._misses.popitem(last=False)
+        return coords
+    
+    async def _lookup(self, key: str, location_name: str) -> tuple[str, Optional[tuple[float, float]]]:
+        """Resolve a name from the persistent cache, falling back to the API; returns (status, coords)"""
+        store = await self._get_store()
+        if store is not None:
+            try:
+                cached = await asyncio.to_thread(store.get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Geocode cache read failed for '{location_name}': {e}")
+                cached = None
+            if cached is not None:
+                return cached
+        
+        status, coords = await self._request_geocode(location_name)
+        # Errors and quota failures are transient; only definite answers are stored
+        if store is not None and status in ('OK', 'ZERO_RESULTS'):
+            try:
+                await asyncio.to_thread(store.put, key, status, coords)
+            except sqlite3.Error as e:
+                logger.warning(f"Geocode cache write failed for '{location_name}': {e}")
+        return status, coords
+    
+    async def _request_geocode(self, location_name: str) -> tuple[str, Optional[tuple[float, float]]]:
+        """Call the Google Geocoding API for a location name; returns the API status and coordinates"""
+        try:
+            client = self._get_client()
+            
+            url = "https://maps.googleapis.com/maps/api/geocode/json"
+            params = {
+                'address': location_name,
+                'key': self.api_key
+            }
+            
+            response = await client.get(url, params=params)
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                status = data.get('status', 'Unknown error')
+                if status == 'OK' and data['results']:
+                    location = data['results'][0]['geometry']['location']
+                    return 'OK', (location['lat'], location['lng'])
+                else:
+                    logger.warning(f"Geocoding failed for '{location_name}': {status}")
+                    return ('ZERO_RESULTS' if status in ('OK', 'ZERO_RESULTS') else status), None
+            else:
+                logger.error(f"Geocoding API request failed with status {response.status_code}")
+                return 'HTTP_ERROR', None
+        
+        except Exception as e:
+            logger.error(f"Error geocoding '{location_name}': {e}")
+            return 'ERROR', None
+
+
+@lru_cache(maxsize=4096)
+def _coordinate_radians(lat: float, lng: float) -> tuple[float, float, float]:
+    """(lat, lng, cos(lat)) in radians for a point; cached since route legs share their endpoints"""
+    lat_rad = radians(lat)
+    return lat_rad, radians(lng), cos(lat_rad)
+
+
+def _haversine(
+    lat1_rad: float, lng1_rad: float, cos_lat1: float, alt1: float,
+    lat2_rad: float, lng2_rad: float, cos_lat2: float, alt2: float,
+) -> float:
+    """Haversine distance in meters from _coordinate_radians values, including the altitude difference"""
+    R = 6371000.0  # Earth's radius in meters
+    
+    delta_lat = lat2_rad - lat1_rad
+    delta_lng = lng2_rad - lng1_rad
+    
+    a = sin(delta_lat/2)**2 + cos_lat1 * cos_lat2 * sin(delta_lng/2)**2
+    c = 2.0 * asin(sqrt(a) if a < 1.0 else 1.0)
+    
+    horizontal_distance = R * c
+    
+    return hypot(horizontal_distance, alt2 - alt1)
+
+
+if njit is not None:
+    _haversine = njit(cache=True, fastmath=True)(_haversine)
+
+
+class MissionPlanningService:
+    """Service for generating mission plans using multiple LLM calls and geocoding"""
+    
+    def __init__(self):
+        self.geocoding_service = GeoCodingService()
+        # Geocoding lookups started during Phase 1, referenced until done so they aren't garbage collected
+        self._prefetch_tasks: set[asyncio.Task] = set()
+        
+        self.structure_system_prompt = _STRUCTURE_SYSTEM_PROMPT
+        self.detailed_system_prompt = _DETAILED_SYSTEM_PROMPT
+
+    async def close(self):
+        """Release the geocoding HTTP session. Call once on application shutdown."""
+        await self.geocoding_service.close()
+
     async def generate_mission_plan(
         self,
         request: MissionPlanRequest
@@ -201,21 +703,36 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
         debug_print(f"📋 [MISSION] Objective: {request.objective.description}")
         
         # Phase 1: Structure Analysis (0-30% progress)
-        yield StreamingChunk(
-            type="status",
+        yield StreamingChunk.model_construct(
+            type=ChunkType.STATUS,
             content="Phase 1/3: Analyzing mission structure and identifying key locations...",
-            data={"phase": 1, "total_phases": 3, "progress": 5},
+            data=_PHASE_STARTED[1],
             sequence=sequence,
             is_final=False
         )
         sequence += 1
         
+        # Each key location is geocoded as soon as Phase 1 streams it, overlapping the rest of the
+        # LLM output; Phase 2 then awaits these tasks instead of starting the lookups itself
+        geocode_semaphore = asyncio.Semaphore(_GEOCODE_CONCURRENCY)
+        prefetched: Dict[str, asyncio.Task] = {}
+        
+        def prefetch_location(location_name: str):
+            key = _normalize_location_name(location_name)
+            if key not in prefetched:
+                # Unused lookups (e.g. from a retried attempt) are left to finish: other requests may be
+                # sharing them through the geocoding service, and their results still warm its cache
+                task = asyncio.create_task(self._geocode_location(location_name, geocode_semaphore))
+                self._prefetch_tasks.add(task)
+                task.add_done_callback(self._prefetch_tasks.discard)
+                prefetched[key] = task
+        
         try:
-            structure_data = await self._generate_mission_structure(request)
+            structure_data = await self._generate_mission_structure(request, on_location=prefetch_location)
             debug_print(f"🏗️ [MISSION] Structure analysis complete: {len(structure_data.get('key_locations', []))} locations identified")
             
-            yield StreamingChunk(
-                type="status",
+            yield StreamingChunk.model_construct(
+                type=ChunkType.STATUS,
                 content=f"✅ Mission structure analyzed - {len(structure_data.get('key_locations', []))} locations identified",
                 data={"phase": 1, "total_phases": 3, "progress": 25, "structure_data": structure_data},
                 sequence=sequence,
@@ -225,8 +742,8 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
             
         except Exception as e:
             debug_print(f"❌ [MISSION] Structure analysis failed: {str(e)}")
-            yield StreamingChunk(
-                type="error",
+            yield StreamingChunk.model_construct(
+                type=ChunkType.ERROR,
                 content=f"Mission structure analysis failed: {str(e)}",
                 sequence=sequence,
                 is_final=True
@@ -234,30 +751,33 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
             return
         
         # Phase 2: Geocoding (25-60% progress)
-        yield StreamingChunk(
-            type="status",
+        yield StreamingChunk.model_construct(
+            type=ChunkType.STATUS,
             content="Phase 2/3: Geocoding locations and getting precise coordinates...",
-            data={"phase": 2, "total_phases": 3, "progress": 30},
+            data=_PHASE_STARTED[2],
             sequence=sequence,
             is_final=False
         )
         sequence += 1
         
         try:
-            geocoded_locations = await self._geocode_mission_locations(structure_data, request)
+            geocoded_locations = await self._geocode_mission_locations(
+                structure_data, request, prefetched, geocode_semaphore
+            )
             debug_print(f"🌍 [MISSION] Geocoding complete: {len(geocoded_locations)} locations processed")
             
-            successful_geocodes = 0
+            # Locations that resolved, collected here for the plan metadata
+            resolved_locations: Dict[str, tuple[float, float]] = {}
             for location_name, coords in geocoded_locations.items():
                 if coords:
-                    successful_geocodes += 1
-                    yield StreamingChunk(
-                        type="status",
+                    resolved_locations[location_name] = coords
+                    yield StreamingChunk.model_construct(
+                        type=ChunkType.STATUS,
                         content=f"📍 Geocoded location: {location_name}",
                         data={
                             "phase": 2, 
                             "total_phases": 3, 
-                            "progress": 30 + (successful_geocodes / len(geocoded_locations)) * 25,
+                            "progress": 30 + (len(resolved_locations) / len(geocoded_locations)) * 25,
                             "location": {"name": location_name, "coordinates": coords}
                         },
                         sequence=sequence,
@@ -266,10 +786,10 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
                     sequence += 1
             
             # Geocoding complete
-            yield StreamingChunk(
-                type="status",
-                content=f"✅ Geocoding complete - {successful_geocodes}/{len(geocoded_locations)} locations processed",
-                data={"phase": 2, "total_phases": 3, "progress": 55},
+            yield StreamingChunk.model_construct(
+                type=ChunkType.STATUS,
+                content=f"✅ Geocoding complete - {len(resolved_locations)}/{len(geocoded_locations)} locations processed",
+                data=_GEOCODING_DONE,
                 sequence=sequence,
                 is_final=False
             )
@@ -277,8 +797,8 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
                     
         except Exception as e:
             debug_print(f"❌ [MISSION] Geocoding failed: {str(e)}")
-            yield StreamingChunk(
-                type="error",
+            yield StreamingChunk.model_construct(
+                type=ChunkType.ERROR,
                 content=f"Location geocoding failed: {str(e)}",
                 sequence=sequence,
                 is_final=True
@@ -286,10 +806,10 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
             return
         
         # Phase 3: Detailed Mission Planning (60-100% progress)
-        yield StreamingChunk(
-            type="status",
+        yield StreamingChunk.model_construct(
+            type=ChunkType.STATUS,
             content="Phase 3/3: Creating detailed mission plan with optimized waypoints...",
-            data={"phase": 3, "total_phases": 3, "progress": 60},
+            data=_PHASE_STARTED[3],
             sequence=sequence,
             is_final=False
         )
@@ -297,31 +817,38 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
         
         try:
             async for chunk in self._generate_detailed_mission_plan(
-                request, structure_data, geocoded_locations, sequence
+                request, structure_data, geocoded_locations, resolved_locations, sequence
             ):
                 yield chunk
                 sequence += 1
                 
         except Exception as e:
             debug_print(f"❌ [MISSION] Detailed planning failed: {str(e)}")
-            yield StreamingChunk(
-                type="error",
+            yield StreamingChunk.model_construct(
+                type=ChunkType.ERROR,
                 content=f"Detailed mission planning failed: {str(e)}",
                 sequence=sequence,
                 is_final=True
             )
 
     @retry_llm_call(max_retries=5, base_delay=1.5)
-    async def _generate_mission_structure(self, request: MissionPlanRequest) -> Dict[str, Any]:
-        """Phase 1: Analyze mission structure and identify key locations"""
+    async def _generate_mission_structure(
+        self,
+        request: MissionPlanRequest,
+        on_location: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """Phase 1: Analyze mission structure and identify key locations
+        
+        on_location, if given, is called with each key location name as soon as it has streamed.
+        """
         
         prompt = self._build_structure_prompt(request)
         debug_print(f"🔧 [MISSION] Built structure analysis prompt: {len(prompt)} chars")
         
-        accumulated_content = ""
+        content_parts: List[str] = []
+        location_scanner = _JsonArrayScanner('key_locations') if on_location else None
         
         # Use default model if none specified
-        default_model = os.getenv('OPENROUTER_API_MODEL', 'google/gemini-2.5-pro')
         model_to_use = request.model or default_model
         debug_print(f"🤖 [MISSION] Using model for structure analysis: {model_to_use}")
         
@@ -331,48 +858,49 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
             model=model_to_use,
             include_reasoning=False
         ):
-            if hasattr(chunk, 'choices') and chunk.choices:
-                delta = chunk.choices[0].delta
-                if hasattr(delta, 'content') and delta.content:
-                    accumulated_content += delta.content
-                    
-                if chunk.choices[0].finish_reason == 'stop':
-                    # Parse the structure response
-                    try:
-                        # Try to extract JSON from the response
-                        start_idx = accumulated_content.find('{')
-                        if start_idx != -1:
-                            brace_count = 0
-                            end_idx = start_idx
-                            for i, char in enumerate(accumulated_content[start_idx:], start_idx):
-                                if char == '{':
-                                    brace_count += 1
-                                elif char == '}':
-                                    brace_count -= 1
-                                    if brace_count == 0:
-                                        end_idx = i + 1
-                                        break
-                            
-                            json_text = accumulated_content[start_idx:end_idx]
-                            structure_data = json.loads(json_text)
-                            debug_print(f"✅ [MISSION] Structure analysis parsed successfully")
-                            return structure_data
-                        else:
-                            raise ValueError("No JSON found in structure analysis response")
-                            
-                    except (json.JSONDecodeError, ValueError) as e:
-                        debug_print(f"⚠️ [MISSION] Structure analysis JSON parse failed: {e}")
-                        debug_print(f"📄 [MISSION] Raw content: {repr(accumulated_content)}")
-                        raise
+            choices = getattr(chunk, 'choices', None)
+            if not choices:
+                continue
+            choice = choices[0]
+            content = getattr(choice.delta, 'content', None)
+            if content:
+                content_parts.append(content)
+                
+                if location_scanner is not None:
+                    for location_text in location_scanner.feed(content):
+                        try:
+                            location = orjson.loads(location_text)
+                            name = location.get('name')
+                        except Exception as e:
+                            # The full parse below reports the problem; just stop prefetching
+                            debug_print(f"⚠️ [MISSION] Could not read streamed location, waiting for full structure: {e}")
+                            location_scanner = None
+                            break
+                        if isinstance(name, str) and name.strip() and _location_coordinates(location) is None:
+                            on_location(name.strip())
+                
+            if choice.finish_reason == 'stop':
+                accumulated_content = "".join(content_parts)
+                # Parse the structure response
+                try:
+                    structure_data = _parse_llm_json(accumulated_content)
+                    debug_print(f"✅ [MISSION] Structure analysis parsed successfully")
+                    return structure_data
+                except (json.JSONDecodeError, ValueError) as e:
+                    debug_print(f"⚠️ [MISSION] Structure analysis JSON parse failed: {e}")
+                    debug_print(f"📄 [MISSION] Raw content: {repr(accumulated_content)}")
+                    raise
         
         raise ValueError("No structure analysis response received")
 
     async def _geocode_mission_locations(
         self, 
         structure_data: Dict[str, Any], 
-        request: MissionPlanRequest
+        request: MissionPlanRequest,
+        prefetched: Dict[str, asyncio.Task],
+        semaphore: asyncio.Semaphore
     ) -> Dict[str, Optional[tuple[float, float]]]:
-        """Phase 2: Geocode all identified locations"""
+        """Phase 2: Geocode all identified locations, reusing lookups started while Phase 1 streamed"""
         
         geocoded_locations = {}
         
@@ -385,225 +913,234 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
             for i, coord in enumerate(request.area_of_interest):
                 geocoded_locations[f"aoi_point_{i+1}"] = (coord.lat, coord.lng)
         
-        # Geocode locations from structure analysis
+        # Geocode locations from structure analysis; names differing only in case or spacing are
+        # looked up once, under the first spelling seen. Locations the request gave exact
+        # coordinates for come back with them and need no lookup.
+        seen = {_normalize_location_name(name) for name in geocoded_locations}
+        pending = []
         for location in structure_data.get('key_locations', []):
-            location_name = location.get('name', '')
-            if location_name and location_name not in geocoded_locations:
-                debug_print(f"🌍 [MISSION] Geocoding: {location_name}")
-                coords = await self.geocoding_service.geocode_location(location_name)
-                geocoded_locations[location_name] = coords
-                
-                if coords:
-                    debug_print(f"✅ [MISSION] Geocoded '{location_name}': {coords}")
+            name = (location.get('name') or '').strip()
+            key = _normalize_location_name(name)
+            if name and key not in seen:
+                seen.add(key)
+                coords = _location_coordinates(location)
+                if coords is not None:
+                    geocoded_locations[name] = coords
                 else:
-                    debug_print(f"⚠️ [MISSION] Failed to geocode '{location_name}'")
+                    pending.append(name)
+        
+        # Look the remaining names up concurrently, bounded to stay within the Geocoding API's QPS limit
+        lookups = [
+            prefetched.pop(_normalize_location_name(name), None) or self._geocode_location(name, semaphore)
+            for name in pending
+        ]
+        results = await asyncio.gather(*lookups, return_exceptions=True)
+        
+        for location_name, coords in zip(pending, results):
+            # BaseException too: a cancelled prefetch task comes back as a CancelledError
+            if isinstance(coords, BaseException):
+                logger.error(f"Error geocoding '{location_name}': {coords}")
+                coords = None
+            geocoded_locations[location_name] = coords
+            
+            if coords:
+                debug_print(f"✅ [MISSION] Geocoded '{location_name}': {coords}")
+            else:
+                debug_print(f"⚠️ [MISSION] Failed to geocode '{location_name}'")
         
         return geocoded_locations
 
+    async def _geocode_location(
+        self,
+        location_name: str,
+        semaphore: asyncio.Semaphore
+    ) -> Optional[tuple[float, float]]:
+        # Names already in memory resolve at once instead of queueing for an API slot
+        coords = self.geocoding_service.cached_location(location_name)
+        if coords is not None:
+            return coords
+        async with semaphore:
+            debug_print(f"🌍 [MISSION] Geocoding: {location_name}")
+            return await self.geocoding_service.geocode_location(location_name)
+
     async def _generate_detailed_mission_plan(
         self,
         request: MissionPlanRequest,
         structure_data: Dict[str, Any],
         geocoded_locations: Dict[str, Optional[tuple[float, float]]],
+        resolved_locations: Dict[str, tuple[float, float]],
         start_sequence: int
     ) -> AsyncGenerator[StreamingChunk, None]:
-        """Phase 3: Generate detailed mission plan with precise coordinates"""
+        """Phase 3: Generate detailed mission plan with precise coordinates
+        
+        geocoded_locations includes failed lookups (the prompt tells the model about them);
+        resolved_locations holds only the ones with coordinates.
+        """
         
         sequence = start_sequence
         prompt = self._build_detailed_prompt(request, structure_data, geocoded_locations)
         debug_print(f"🔧 [MISSION] Built detailed planning prompt: {len(prompt)} chars")
         
-        # Define the expected JSON schema for structured output
-        response_schema = {
-            "type": "object",
-            "properties": {
-                "mission_name": {"type": "string"},
-                "mission_description": {"type": "string"},
-                "waypoints": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "id": {"type": "string"},
-                            "type": {"type": "string", "enum": ["takeoff", "waypoint", "loiter", "survey", "orbit", "land"]},
-                            "position": {
-                                "type": "object",
-                                "properties": {
-                                    "lat": {"type": "number"},
-                                    "lng": {"type": "number"},
-                                    "alt": {"type": "number"}
-                                },
-                                "required": ["lat", "lng", "alt"]
-                            },
-                            "order": {"type": "integer"},
-                            "name": {"type": "string"},
-                            "speed": {"type": "number"},
-                            "loiter_time": {"type": "number"},
-                            "radius": {"type": "number"},
-                            "camera_action": {"type": "string"}
-                        },
-                        "required": ["id", "type", "position", "order"]
-                    }
-                },
-                "estimated_duration": {"type": "number"},
-                "total_distance": {"type": "number"},
-                "warnings": {
-                    "type": "array",
-                    "items": {"type": "string"}
-                }
-            },
-            "required": ["mission_name", "mission_description", "waypoints", "estimated_duration", "total_distance"]
-        }
+        content_parts: List[str] = []
         
-        accumulated_content = ""
-        accumulated_reasoning = ""
+        # Waypoints are streamed to the client as soon as each one closes in the LLM output
+        waypoint_scanner: Optional[_JsonArrayScanner] = _JsonArrayScanner("waypoints")
+        streamed_waypoints = 0
         
         # Use default model if none specified
-        default_model = os.getenv('OPENROUTER_API_MODEL', 'google/gemini-2.5-pro')
         model_to_use = request.model or default_model
         debug_print(f"🤖 [MISSION] Using model for detailed planning: {model_to_use}")
         
-        async for chunk in stream_text(
+        async for chunk in _buffered(stream_text(
             prompt=prompt,
             system_prompt=self.detailed_system_prompt,
             model=model_to_use,
-            response_schema=response_schema if not request.include_reasoning else None,
+            response_schema=_DETAILED_PLAN_SCHEMA if not request.include_reasoning else None,
             schema_name="detailed_mission_plan",
             include_reasoning=request.include_reasoning
-        ):
-            if hasattr(chunk, 'choices') and chunk.choices:
-                delta = chunk.choices[0].delta
-                
-                # Check for reasoning content
-                if hasattr(delta, 'reasoning') and delta.reasoning:
-                    accumulated_reasoning += delta.reasoning
-                    yield StreamingChunk(
-                        type="reasoning",
-                        content=delta.reasoning,
-                        sequence=sequence,
-                        is_final=False
-                    )
-                    sequence += 1
+        )):
+            if chunk is None:
+                # The LLM has gone quiet; tell the client we are still working (progress unchanged)
+                yield StreamingChunk.model_construct(
+                    type=ChunkType.STATUS,
+                    content="⏳ Still generating the detailed mission plan...",
+                    data=_HEARTBEAT_DATA,
+                    sequence=sequence,
+                    is_final=False
+                )
+                sequence += 1
+                continue
+            
+            choices = getattr(chunk, 'choices', None)
+            if not choices:
+                continue
+            choice = choices[0]
+            delta = choice.delta
+            
+            # Check for reasoning content
+            reasoning = getattr(delta, 'reasoning', None)
+            if reasoning:
+                yield StreamingChunk.model_construct(
+                    type=ChunkType.REASONING,
+                    content=reasoning,
+                    sequence=sequence,
+                    is_final=False
+                )
+                sequence += 1
+            
+            # Check for regular content
+            content = getattr(delta, 'content', None)
+            if content:
+                content_parts.append(content)
                 
-                # Check for regular content
-                if hasattr(delta, 'content') and delta.content:
-                    accumulated_content += delta.content
-                    
-                # Check if we have a complete JSON response
-                if chunk.choices[0].finish_reason == 'stop':
-                    # Parse and yield the final plan
-                    debug_print(f"🔍 [MISSION] Parsing detailed plan: {accumulated_content[:200]}...")
-                    
-                    # Try to extract JSON from the response
-                    try:
-                        # First try direct parsing
-                        plan_data = json.loads(accumulated_content)
-                    except json.JSONDecodeError:
-                        # If that fails, try to find JSON within the text
-                        debug_print("⚠️ [MISSION] Direct JSON parse failed, searching for JSON in text...")
-                        
-                        # Look for JSON block between { and }
-                        start_idx = accumulated_content.find('{')
-                        if start_idx != -1:
-                            # Find the matching closing brace
-                            brace_count = 0
-                            end_idx = start_idx
-                            for i, char in enumerate(accumulated_content[start_idx:], start_idx):
-                                if char == '{':
-                                    brace_count += 1
-                                elif char == '}':
-                                    brace_count -= 1
-                                    if brace_count == 0:
-                                        end_idx = i + 1
-                                        break
-                            
-                            json_text = accumulated_content[start_idx:end_idx]
-                            debug_print(f"🔧 [MISSION] Extracted JSON: {json_text[:200]}...")
-                            plan_data = json.loads(json_text)
-                        else:
-                            raise ValueError("No JSON found in response")
-                    
-                    # Convert to our model format
-                    waypoints = []
-                    total_waypoints = len(plan_data['waypoints'])
-                    
-                    for i, wp_data in enumerate(plan_data['waypoints'], 1):
-                        waypoint = Waypoint(
-                            id=wp_data.get('id', str(uuid.uuid4())),
-                            type=WaypointType(wp_data['type']),
-                            position=Coordinate(**wp_data['position']),
-                            order=wp_data['order'],
-                            name=wp_data.get('name'),
-                            speed=wp_data.get('speed'),
-                            loiter_time=wp_data.get('loiter_time'),
-                            radius=wp_data.get('radius'),
-                            camera_action=wp_data.get('camera_action')
-                        )
-                        waypoints.append(waypoint)
+                if waypoint_scanner is not None:
+                    for wp_text in waypoint_scanner.feed(content):
+                        # Progress only; the waypoint is validated when the final plan is built
+                        try:
+                            wp_data = orjson.loads(wp_text)
+                            if wp_data.get('type') not in _WAYPOINT_TYPES:
+                                raise ValueError(f"unknown waypoint type {wp_data.get('type')!r}")
+                        except Exception as e:
+                            # Leave the rest to the full parse once the response is complete
+                            debug_print(f"⚠️ [MISSION] Could not stream waypoint, waiting for full plan: {e}")
+                            waypoint_scanner = None
+                            break
                         
-                        # Stream waypoint progress
-                        waypoint_progress = 70 + (i / total_waypoints) * 20  # 70-90% for waypoint processing
-                        yield StreamingChunk(
-                            type="status",
-                            content=f"🛰️ Generated waypoint {i}/{total_waypoints}: {waypoint.name or waypoint.type.value}",
+                        streamed_waypoints += 1
+                        yield StreamingChunk.model_construct(
+                            type=ChunkType.STATUS,
+                            content=f"🛰️ Generated waypoint {streamed_waypoints}: {wp_data.get('name') or wp_data['type']}",
                             data={
                                 "phase": 3,
                                 "total_phases": 3,
-                                "progress": waypoint_progress,
-                                "waypoint": waypoint.dict()
+                                "progress": min(70 + streamed_waypoints, 90),
+                                "waypoint": wp_data
                             },
                             sequence=sequence,
                             is_final=False
                         )
                         sequence += 1
-                    
-                    # Create the complete mission plan
-                    mission_plan = MissionPlan(
-                        id=str(uuid.uuid4()),
-                        name=plan_data['mission_name'],
-                        description=plan_data['mission_description'],
-                        waypoints=waypoints,
-                        estimated_duration=plan_data['estimated_duration'],
-                        total_distance=plan_data['total_distance'],
-                        metadata={
-                            "objective": request.objective.dict(),
-                            "generated_by": request.model or "default",
-                            "warnings": plan_data.get('warnings', []),
-                            "structure_analysis": structure_data,
-                            "geocoded_locations": {k: v for k, v in geocoded_locations.items() if v is not None}
-                        }
-                    )
-                    
-                    # Stream completion status
-                    yield StreamingChunk(
-                        type="status",
-                        content="✅ Mission plan generation complete!",
+                
+            # Check if we have a complete JSON response
+            if choice.finish_reason == 'stop':
+                # Parse and yield the final plan
+                accumulated_content = "".join(content_parts)
+                debug_print(f"🔍 [MISSION] Parsing detailed plan: {accumulated_content[:200]}...")
+                
+                plan_data = _parse_llm_json(accumulated_content)
+                missing = [field for field in _DETAILED_PLAN_REQUIRED if field not in plan_data]
+                if missing:
+                    raise ValueError(f"Mission plan response is missing required fields: {', '.join(missing)}")
+                
+                # Convert to our model format; this is where every waypoint gets validated
+                waypoints = [_waypoint_from_data(wp_data) for wp_data in plan_data['waypoints']]
+                total_waypoints = len(waypoints)
+                
+                # Only report waypoints that were not already streamed while generating
+                for i, wp_data in enumerate(plan_data['waypoints'][streamed_waypoints:], streamed_waypoints + 1):
+                    # Stream waypoint progress
+                    waypoint_progress = 70 + (i / total_waypoints) * 20  # 70-90% for waypoint processing
+                    yield StreamingChunk.model_construct(
+                        type=ChunkType.STATUS,
+                        content=f"🛰️ Generated waypoint {i}/{total_waypoints}: {wp_data.get('name') or wp_data['type']}",
                         data={
                             "phase": 3,
                             "total_phases": 3,
-                            "progress": 95,
-                            "plan_summary": {
-                                "name": mission_plan.name,
-                                "waypoints": len(waypoints),
-                                "duration": plan_data['estimated_duration'],
-                                "distance": plan_data['total_distance']
-                            }
+                            "progress": waypoint_progress,
+                            "waypoint": wp_data
                         },
                         sequence=sequence,
                         is_final=False
                     )
                     sequence += 1
-                    
-                    # Stream the complete plan
-                    debug_print(f"✅ [MISSION] Generated complete mission plan: {mission_plan.name}")
-                    debug_print(f"📊 [MISSION] Plan stats: {len(waypoints)} waypoints, {plan_data['estimated_duration']}min, {plan_data['total_distance']}m")
-                    yield StreamingChunk(
-                        type="plan",
-                        data={"progress": 100, "plan": mission_plan.dict()},
-                        sequence=sequence,
-                        is_final=True
-                    )
-                    return
+                
+                # Create the complete mission plan
+                mission_plan = MissionPlan(
+                    id=str(uuid.uuid4()),
+                    name=plan_data['mission_name'],
+                    description=plan_data['mission_description'],
+                    waypoints=waypoints,
+                    estimated_duration=plan_data['estimated_duration'],
+                    total_distance=plan_data['total_distance'],
+                    metadata={
+                        "objective": request.objective.model_dump(),
+                        "generated_by": request.model or "default",
+                        "warnings": plan_data.get('warnings', []),
+                        "structure_analysis": structure_data,
+                        "geocoded_locations": resolved_locations
+                    }
+                )
+                
+                # Stream completion status
+                yield StreamingChunk.model_construct(
+                    type=ChunkType.STATUS,
+                    content="✅ Mission plan generation complete!",
+                    data={
+                        "phase": 3,
+                        "total_phases": 3,
+                        "progress": 95,
+                        "plan_summary": {
+                            "name": mission_plan.name,
+                            "waypoints": len(waypoints),
+                            "duration": plan_data['estimated_duration'],
+                            "distance": plan_data['total_distance']
+                        }
+                    },
+                    sequence=sequence,
+                    is_final=False
+                )
+                sequence += 1
+                
+                # Stream the complete plan
+                debug_print(f"✅ [MISSION] Generated complete mission plan: {mission_plan.name}")
+                debug_print(f"📊 [MISSION] Plan stats: {len(waypoints)} waypoints, {plan_data['estimated_duration']}min, {plan_data['total_distance']}m")
+                yield StreamingChunk.model_construct(
+                    type=ChunkType.PLAN,
+                    data={"progress": 100, "plan": mission_plan.model_dump()},
+                    sequence=sequence,
+                    is_final=True
+                )
+                return
 
     async def generate_mission_plan_simple(
         self,
@@ -619,8 +1156,9 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
             if chunk.type == "reasoning":
                 reasoning += chunk.content or ""
             elif chunk.type == "plan" and chunk.is_final:
-                mission_plan = MissionPlan(**chunk.data)
-                warnings = chunk.data.get('metadata', {}).get('warnings', [])
+                plan_data = chunk.data["plan"]
+                mission_plan = _plan_adapter.validate_python(plan_data)
+                warnings = (plan_data.get('metadata') or {}).get('warnings', [])
         
         if mission_plan:
             return MissionPlanResponse(
@@ -648,7 +1186,7 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
             prompt_parts.append(f"**Constraints**: {', '.join(request.objective.constraints)}")
         
         if request.start_position:
-            prompt_parts.append(f"\n**Start Position**: Lat: {request.start_position.lat}, Lng: {request.start_position.lng}, Alt: {request.start_position.alt or 0}m")
+            prompt_parts.append(f"\n**Start Position**: Lat: {request.start_position.lat}, Lng: {request.start_position.lng}, Alt: {request.start_position.alt}m")
         
         if request.area_of_interest:
             prompt_parts.append("\n**Area of Interest**:")
@@ -656,29 +1194,10 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
                 prompt_parts.append(f"  Point {i+1}: Lat: {coord.lat}, Lng: {coord.lng}")
         
         if request.drone_capabilities:
-            cap = request.drone_capabilities
-            prompt_parts.append("\n**Drone Capabilities**:")
-            prompt_parts.append(f"  - Max Altitude: {cap.max_altitude}m")
-            prompt_parts.append(f"  - Max Speed: {cap.max_speed}m/s")
-            prompt_parts.append(f"  - Flight Time: {cap.flight_time} minutes")
-            prompt_parts.append(f"  - Camera: {'Yes' if cap.has_camera else 'No'}")
-            prompt_parts.append(f"  - Gimbal: {'Yes' if cap.has_gimbal else 'No'}")
-            if cap.payload_capacity:
-                prompt_parts.append(f"  - Payload Capacity: {cap.payload_capacity}kg")
+            prompt_parts.append(_drone_capabilities_block(request.drone_capabilities))
         
         if request.environment:
-            env = request.environment
-            prompt_parts.append("\n**Environmental Conditions**:")
-            if env.wind_speed is not None:
-                prompt_parts.append(f"  - Wind Speed: {env.wind_speed}m/s")
-            if env.wind_direction is not None:
-                prompt_parts.append(f"  - Wind Direction: {env.wind_direction}°")
-            if env.temperature is not None:
-                prompt_parts.append(f"  - Temperature: {env.temperature}°C")
-            if env.visibility is not None:
-                prompt_parts.append(f"  - Visibility: {env.visibility}m")
-            if env.no_fly_zones:
-                prompt_parts.append(f"  - No-Fly Zones: {len(env.no_fly_zones)} defined")
+            prompt_parts.append(_environment_block(request.environment))
         
         prompt_parts.append("\nIdentify key locations, waypoint types needed, and mission structure.")
         
@@ -692,91 +1211,152 @@ RESPOND WITH ONLY THE JSON - NO OTHER TEXT."""
     ) -> str:
         """Build the prompt for detailed mission planning"""
         
+        objective = request.objective
+        considerations = structure_data.get('considerations')
+        waypoint_sequence = structure_data.get('waypoint_sequence')
+        
         prompt_parts = [
-            f"Create a detailed drone mission plan based on the following analysis and coordinates:",
-            f"\n**Original Objective**: {request.objective.description}",
-            f"**Priority**: {request.objective.priority}",
+            _DETAILED_PROMPT_HEADER,
+            f"\n**Original Objective**: {objective.description}",
+            f"**Priority**: {objective.priority}",
         ]
         
         # Add structure analysis results
-        prompt_parts.append(f"\n**Mission Structure Analysis**:")
-        prompt_parts.append(f"  - Mission Type: {structure_data.get('mission_type', 'custom')}")
-        prompt_parts.append(f"  - Complexity: {structure_data.get('estimated_complexity', 'moderate')}")
+        prompt_parts.append(
+            "\n**Mission Structure Analysis**:\n"
+            f"  - Mission Type: {structure_data.get('mission_type', 'custom')}\n"
+            f"  - Complexity: {structure_data.get('estimated_complexity', 'moderate')}"
+        )
         
-        if structure_data.get('considerations'):
-            prompt_parts.append(f"  - Considerations: {', '.join(structure_data['considerations'])}")
+        if considerations:
+            prompt_parts.append(f"  - Considerations: {', '.join(considerations)}")
         
         # Add geocoded locations
-        prompt_parts.append(f"\n**Precise Coordinates for Key Locations**:")
-        for location_name, coords in geocoded_locations.items():
-            if coords:
-                prompt_parts.append(f"  - {location_name}: Lat: {coords[0]:.6f}, Lng: {coords[1]:.6f}")
-            else:
-                prompt_parts.append(f"  - {location_name}: GEOCODING FAILED - use fallback coordinates")
+        prompt_parts.append("\n".join((
+            "\n**Precise Coordinates for Key Locations**:",
+            *(
+                f"  - {location_name}: Lat: {coords[0]:.6f}, Lng: {coords[1]:.6f}" if coords
+                else f"  - {location_name}: GEOCODING FAILED - use fallback coordinates"
+                for location_name, coords in geocoded_locations.items()
+            ),
+        )))
         
         # Add waypoint sequence from structure analysis
-        if structure_data.get('waypoint_sequence'):
-            prompt_parts.append(f"\n**Recommended Waypoint Sequence**:")
-            for i, wp in enumerate(structure_data['waypoint_sequence'], 1):
-                prompt_parts.append(f"  {i}. {wp.get('type', 'waypoint').upper()}: {wp.get('purpose', 'No description')}")
-                if wp.get('location_reference'):
-                    prompt_parts.append(f"     Location: {wp['location_reference']}")
+        if waypoint_sequence:
+            prompt_parts.append("\n".join((
+                "\n**Recommended Waypoint Sequence**:",
+                *(
+                    f"  {i}. {wp.get('type', 'waypoint').upper()}: {wp.get('purpose', 'No description')}"
+                    + (f"\n     Location: {wp['location_reference']}" if wp.get('location_reference') else "")
+                    for i, wp in enumerate(waypoint_sequence, 1)
+                ),
+            )))
         
         # Add original constraints
-        if request.objective.constraints:
-            prompt_parts.append(f"\n**Constraints**: {', '.join(request.objective.constraints)}")
+        if objective.constraints:
+            prompt_parts.append(f"\n**Constraints**: {', '.join(objective.constraints)}")
         
         # Add drone capabilities
-        if request.drone_capabilities:
-            cap = request.drone_capabilities
-            prompt_parts.append("\n**Drone Capabilities**:")
-            prompt_parts.append(f"  - Max Altitude: {cap.max_altitude}m")
-            prompt_parts.append(f"  - Max Speed: {cap.max_speed}m/s")
-            prompt_parts.append(f"  - Flight Time: {cap.flight_time} minutes")
-            prompt_parts.append(f"  - Camera: {'Yes' if cap.has_camera else 'No'}")
-            prompt_parts.append(f"  - Gimbal: {'Yes' if cap.has_gimbal else 'No'}")
-            if cap.payload_capacity:
-                prompt_parts.append(f"  - Payload Capacity: {cap.payload_capacity}kg")
+        capabilities = request.drone_capabilities
+        if capabilities:
+            prompt_parts.append(_drone_capabilities_block(capabilities))
         
         # Add environmental conditions
-        if request.environment:
-            env = request.environment
-            prompt_parts.append("\n**Environmental Conditions**:")
-            if env.wind_speed is not None:
-                prompt_parts.append(f"  - Wind Speed: {env.wind_speed}m/s")
-            if env.wind_direction is not None:
-                prompt_parts.append(f"  - Wind Direction: {env.wind_direction}°")
-            if env.temperature is not None:
-                prompt_parts.append(f"  - Temperature: {env.temperature}°C")
-            if env.visibility is not None:
-                prompt_parts.append(f"  - Visibility: {env.visibility}m")
-            if env.no_fly_zones:
-                prompt_parts.append(f"  - No-Fly Zones: {len(env.no_fly_zones)} defined")
-        
-        prompt_parts.append("\nUse the precise coordinates provided above to create an optimized mission plan.")
-        prompt_parts.append("Ensure waypoints follow logical sequence and maintain safety margins.")
-        prompt_parts.append("Calculate realistic timing and distances based on drone capabilities.")
+        environment = request.environment
+        if environment:
+            prompt_parts.append(_environment_block(environment))
+        
+        prompt_parts.append(_DETAILED_PROMPT_CLOSING)
         
         return "\n".join(prompt_parts)
 
     def calculate_distance(self, coord1: Coordinate, coord2: Coordinate) -> float:
         """Calculate distance between two coordinates in meters using Haversine formula"""
         
+        # Repeated points (start, hover) are zero-length legs apart from any climb
+        if coord1.lat == coord2.lat and coord1.lng == coord2.lng:
+            return abs(coord2.alt - coord1.alt)
+        
+        return _haversine(
+            *_coordinate_radians(coord1.lat, coord1.lng), coord1.alt,
+            *_coordinate_radians(coord2.lat, coord2.lng), coord2.alt,
+        )
+
+    def calculate_distance_fast(self, coord1: Coordinate, coord2: Coordinate, threshold_m: float = 50_000.0) -> float:
+        """
+        calculate_distance with a flat-Earth shortcut for short legs.
+        
+        Legs shorter than threshold_m use the equirectangular approximation, which needs no
+        trigonometry once the endpoints' radians are cached. At the default threshold it stays
+        within 0.001% of Haversine below 60 degrees latitude and about 0.01% up to 80 degrees,
+        growing toward the poles. Longer legs use calculate_distance.
+        """
+        
+        lat1_rad, lng1_rad, cos_lat1 = _coordinate_radians(coord1.lat, coord1.lng)
+        lat2_rad, lng2_rad, cos_lat2 = _coordinate_radians(coord2.lat, coord2.lng)
+        
+        # Take the short way round across the antimeridian
+        delta_lng = lng2_rad - lng1_rad
+        if delta_lng > pi:
+            delta_lng -= 2 * pi
+        elif delta_lng < -pi:
+            delta_lng += 2 * pi
+        
+        # Mean of the endpoint cosines stands in for the cosine of the mean latitude
+        x = delta_lng * (cos_lat1 + cos_lat2) / 2
+        y = lat2_rad - lat1_rad
+        horizontal_distance = 6371000.0 * sqrt(x * x + y * y)
+        
+        if horizontal_distance >= threshold_m:
+            return self.calculate_distance(coord1, coord2)
+        
+        return hypot(horizontal_distance, coord2.alt - coord1.alt)
+
+    def calculate_distances(self, coords1: np.ndarray, coords2: np.ndarray) -> np.ndarray:
+        """
+        Vectorized calculate_distance: Haversine distances in meters between matching rows.
+        
+        coords1 and coords2 are (N, 2) lat/lng or (N, 3) lat/lng/alt arrays in degrees and meters;
+        they broadcast, so an (N, 1, 3) and a (1, M, 3) array give an (N, M) distance matrix.
+        A NaN altitude means unknown, and that pair's distance is horizontal only.
+        """
+        coords1 = np.asarray(coords1, dtype=np.float64)
+        coords2 = np.asarray(coords2, dtype=np.float64)
+        
         R = 6371000  # Earth's radius in meters
         
-        lat1_rad = math.radians(coord1.lat)
-        lat2_rad = math.radians(coord2.lat)
-        delta_lat = math.radians(coord2.lat - coord1.lat)
-        delta_lng = math.radians(coord2.lng - coord1.lng)
+        lat1 = np.radians(coords1[..., 0])
+        lat2 = np.radians(coords2[..., 0])
+        delta_lat = lat2 - lat1
+        delta_lng = np.radians(coords2[..., 1] - coords1[..., 1])
         
-        a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+        a = np.sin(delta_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(delta_lng / 2) ** 2
+        horizontal_distance = R * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
         
-        horizontal_distance = R * c
+        # Add altitude difference where both altitudes are known
+        if coords1.shape[-1] > 2 and coords2.shape[-1] > 2:
+            altitude_diff = coords2[..., 2] - coords1[..., 2]
+            known = ~np.isnan(altitude_diff)
+            return np.where(known, np.hypot(horizontal_distance, np.where(known, altitude_diff, 0.0)), horizontal_distance)
         
-        # Add altitude difference if available
-        if coord1.alt is not None and coord2.alt is not None:
-            altitude_diff = abs(coord2.alt - coord1.alt)
-            return math.sqrt(horizontal_distance**2 + altitude_diff**2)
+        return horizontal_distance
+
+    def distance_matrix(self, coords: Union[List[Coordinate], np.ndarray]) -> np.ndarray:
+        """
+        Pairwise calculate_distance for a set of points, as an (N, N) array in meters.
+        
+        coords is a list of Coordinates or an already packed (N, 3) lat/lng/alt array such as
+        MissionPlan.waypoints_xyz; the matrix is built in one broadcast instead of N² Python calls.
+        """
+        points = coords if isinstance(coords, np.ndarray) else _coordinates_to_array(coords)
+        return self.calculate_distances(points[:, np.newaxis, :], points[np.newaxis, :, :])
+
+    def total_path_length(self, path: Union[List[Coordinate], np.ndarray]) -> float:
+        """
+        Length in meters of a path visiting the points in order: the sum of calculate_distance
+        over consecutive legs, computed in one vectorized pass.
         
-        return horizontal_distance 
\ No newline at end of file
+        path is a list of Coordinates or a packed (N, 3) lat/lng/alt array such as MissionPlan.waypoints_xyz.
+        """
+        points = path if isinstance(path, np.ndarray) else _coordinates_to_array(path)
+        return float(self.calculate_distances(points[:-1], points[1:]).sum())
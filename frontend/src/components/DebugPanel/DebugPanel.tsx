@@ -21,7 +21,7 @@ import {
 } from '@mui/icons-material';
 
 interface DebugMessage {
-  timestamp: string;
+  timestamp: string | number;
   level: string;
   message: string;
 }
@@ -58,8 +58,10 @@ const DebugPanel: React.FC = () => {
 
       ws.onmessage = (event) => {
         try {
-          const debugData: DebugMessage = JSON.parse(event.data);
-          setMessages(prev => [...prev, debugData]);
+          // The API sends batches as JSON arrays; single messages (e.g. on connect) as objects
+          const debugData: DebugMessage | DebugMessage[] = JSON.parse(event.data);
+          const batch = Array.isArray(debugData) ? debugData : [debugData];
+          setMessages(prev => [...prev, ...batch]);
         } catch (e) {
           console.error('Failed to parse debug message:', e);
         }
@@ -8,6 +8,22 @@ import {
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:9000';
 
+/**
+ * Readable message from a FastAPI error `detail`: a string for HTTPException (400),
+ * or a list of `{loc, msg, type}` validation errors for 422
+ */
+const formatErrorDetail = (detail: unknown): string | undefined => {
+  if (Array.isArray(detail)) {
+    return detail
+      .map((d: any) => {
+        const field = Array.isArray(d?.loc) ? d.loc[d.loc.length - 1] : undefined;
+        return field !== undefined ? `${field}: ${d?.msg}` : String(d?.msg ?? d);
+      })
+      .join('; ');
+  }
+  return typeof detail === 'string' ? detail : undefined;
+};
+
 class MissionPlanningApi {
   private baseUrl: string;
 
@@ -76,7 +92,11 @@ class MissionPlanningApi {
                 if (event.event === 'done') {
                   return;
                 }
-                onChunk(event.data);
+                // Chunks arrive batched as {events: [...]}; single events are still accepted
+                const events = Array.isArray(event.events) ? event.events : [event];
+                for (const item of events) {
+                  onChunk(item.data);
+                }
               } catch (e) {
                 console.error('Failed to parse SSE data:', e);
               }
@@ -214,8 +234,8 @@ class MissionPlanningApi {
     } catch (error: any) {
       if (error.response?.status === 404) {
         throw new Error('Mission not found. Make sure to generate and save a mission first.');
-      } else if (error.response?.status === 400) {
-        throw new Error(error.response?.data?.detail || 'Invalid export parameters');
+      } else if (error.response?.status === 400 || error.response?.status === 422) {
+        throw new Error(formatErrorDetail(error.response?.data?.detail) || 'Invalid export parameters');
       }
       throw new Error(`GeoTIFF export failed: ${error.response?.data?.detail || error.message}`);
     }
@@ -260,8 +280,8 @@ class MissionPlanningApi {
     } catch (error: any) {
       if (error.response?.status === 404) {
         throw new Error('Mission not found. Make sure to generate and save a mission first.');
-      } else if (error.response?.status === 400) {
-        throw new Error(error.response?.data?.detail || 'Invalid export parameters');
+      } else if (error.response?.status === 400 || error.response?.status === 422) {
+        throw new Error(formatErrorDetail(error.response?.data?.detail) || 'Invalid export parameters');
       }
       throw new Error(`PNG export failed: ${error.response?.data?.detail || error.message}`);
     }